@@ -1,5 +1,25 @@
 __author__ = "Lee Zhi Yong"
 
+import asyncio
+import bisect
+import csv
+import hashlib
+import heapq
+import json
+import mmap
+import random
+import struct
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, shared_memory
+
 """
 
     #########################################################################################################
@@ -10,11 +30,40 @@ __author__ = "Lee Zhi Yong"
     #########################################################################################################
     
 """
+class FlowStatistics:
+    """
+        Counters collected by the ford_fulkerson engines when maxThroughput is called with stats=True. The engines only touch these once per BFS and
+        once per augmenting path, and only when a FlowStatistics instance is passed in, so there is no overhead when statistics are disabled.
+
+    """
+    def __init__(self):
+        self.augmenting_paths = 0
+        self.vertices_dequeued = 0
+        self.edges_scanned = 0
+        self.bottlenecks = []
+        self.build_time = 0.0
+        self.solve_time = 0.0
+
+    def record_path(self, path_flow):
+        self.augmenting_paths += 1
+        self.bottlenecks.append(path_flow)
+
+    def statistics(self) -> tuple:
+        """
+        Provides statistics. Returns augmenting_paths, vertices_dequeued, edges_scanned, bottlenecks, build_time and solve_time
+        :complexity: O(1)
+        :return: a tuple containing augmenting_paths, vertices_dequeued, edges_scanned, the list of bottleneck values, and the graph build and solve
+                 times in seconds
+        """
+        return (self.augmenting_paths, self.vertices_dequeued, self.edges_scanned, self.bottlenecks, self.build_time, self.solve_time)
+
 class Graph:
     """
         This Graph class is a modified version of the Graph class I used in Assignment 1 Q1
     
     """
+    ENGINES = ("ford_fulkerson", "dinic")
+
     def __init__(self, vertices_count):
         self.vertices = [None] * (vertices_count * 2 + 2)
         for i in range(vertices_count * 2 + 2):
@@ -35,7 +84,13 @@ class Graph:
             current_vertex = self.vertices[u]
             current_vertex.add_edge(current_edge)
 
-    def bfs(self, start_vertex, end_vertex):
+            # Pair every edge with a reverse residual edge so that flow can be cancelled later on
+            reverse_edge = Edge(v, u, 0)
+            current_edge.reverse = reverse_edge
+            reverse_edge.reverse = current_edge
+            self.vertices[v].add_edge(reverse_edge)
+
+    def bfs(self, start_vertex, end_vertex, stats=None):
         """
             Note:
                 This BFS is a modified version of the BFS given to us in our lecture slides.
@@ -47,6 +102,7 @@ class Graph:
             :Input:
             argv1: The start vertex
             argv2: The end vertex
+            argv3: An optional FlowStatistics that the dequeued vertices and scanned edges are added to
 
             :Preconditions:
                 1. The start and end vertex must be given and valid
@@ -65,14 +121,16 @@ class Graph:
                 space for each vertex, which results in a space complexity of O(C)
 
         """
-        # Create a queue for BFS traversal
+        # Create a queue for BFS traversal, the head index avoids the O(D) cost of list.pop(0)
         queue = []
+        head = 0
         start = self.vertices[start_vertex]
         queue.append(start)
         start.visited = True
 
-        while queue:
-            current_vertex = queue.pop(0)
+        while head < len(queue):
+            current_vertex = queue[head]
+            head += 1
 
             # Check if the current vertex is the end vertex
             if current_vertex.id == end_vertex:
@@ -87,19 +145,27 @@ class Graph:
                     queue.append(next_vertex)
                     next_vertex.visited = True
                     next_vertex.previous = current_vertex.id
+                    next_vertex.previous_edge = edge
+
+        # Everything dequeued is still at the front of the queue, so the counters can be worked out afterwards
+        if stats is not None:
+            stats.vertices_dequeued += head
+            stats.edges_scanned += sum(len(vertex.edges) for vertex in queue[:head] if vertex.id != end_vertex)
 
         # Return True if there is a path from start_vertex to end_vertex, False otherwise
         return self.vertices[end_vertex].visited
     
-    def ford_fulkerson(self, source, sink):
+    def ford_fulkerson(self, source, sink, stats=None):
         """
             Function description: 
                 Ford Fulkerson Method used to find the max flow within the flow network. It generates a residual graph using the original graph before
                 finding the augmented paths and updating the flow until the BFS algorithm can no longer find a path from the source to the sink.
+                Each augmenting path records the edge it arrived through, so parallel edges and reverse residual edges are always updated correctly.
 
             :Input:
             argv1: The source
             argv2: The sink
+            argv3: An optional FlowStatistics to record the search in
 
             :Preconditions:
                 1. The source and sink must be given and valid
@@ -128,28 +194,29 @@ class Graph:
         max_flow = 0
 
         # Find augmenting paths and update the flow until no more paths exist
-        while self.bfs(source, sink):
+        while self.bfs(source, sink, stats):
             # Initialize the path flow to infinity
             path_flow = float("inf")
 
             # Find the minimum residual capacity along the augmenting path
             v = sink
             while v != source:
-                u = self.vertices[v].previous
-                edge = self.find_edge(u, v)
+                edge = self.vertices[v].previous_edge
                 path_flow = min(path_flow, edge.get_residual_capacity())
-                v = u
+                v = edge.u
 
-            # Update the flow along the augmenting path
+            # Update the flow along the augmenting path, and cancel the same amount on the reverse edges
             v = sink
             while v != source:
-                u = self.vertices[v].previous
-                edge = self.find_edge(u, v)
+                edge = self.vertices[v].previous_edge
                 edge.flow += path_flow
-                v = u
+                edge.reverse.flow -= path_flow
+                v = edge.u
 
             # Add the path flow to the overall max flow
             max_flow += path_flow
+            if stats is not None:
+                stats.record_path(path_flow)
 
             # Reset the visited flags and previous pointers for the next iteration
             self.reset_visited()
@@ -157,6 +224,117 @@ class Graph:
         # Return the maximum flow
         return max_flow
 
+    def bfs_levels(self, source, sink):
+        """
+            Function description: 
+                Breadth First Search used by Dinic's algorithm to build the level graph. Every vertex reachable from the source through edges with
+                residual capacity is labelled with its distance from the source; unreachable vertices keep a level of -1.
+
+            :Input:
+            argv1: The source
+            argv2: The sink
+
+            :Output, return or postcondition: Returns true if the sink is reachable in the residual graph, false otherwise.
+
+            :Time complexity: O(D+C), where D is the number of data centres, and C is the number of communication channels
+
+            :Aux space complexity: O(D), where D is the number of data centres
+
+        """
+        for vertex in self.vertices:
+            vertex.level = -1
+
+        queue = [self.vertices[source]]
+        head = 0
+        self.vertices[source].level = 0
+
+        while head < len(queue):
+            current_vertex = queue[head]
+            head += 1
+
+            for edge in current_vertex.edges:
+                next_vertex = self.vertices[edge.v]
+                if next_vertex.level < 0 and edge.get_residual_capacity() > 0:
+                    next_vertex.level = current_vertex.level + 1
+                    queue.append(next_vertex)
+
+        return self.vertices[sink].level >= 0
+
+    def dinic(self, source, sink):
+        """
+            Function description: 
+                Dinic's algorithm used to find the max flow within the flow network. Each phase builds a level graph with bfs_levels() and then saturates
+                it with a blocking flow. The blocking flow only follows edges that go exactly one level deeper, and every vertex keeps a current-arc pointer
+                so that edges which have been found to be useless are never scanned again within the same phase.
+
+            :Input:
+            argv1: The source
+            argv2: The sink
+
+            :Preconditions:
+                1. The source and sink must be given and valid
+
+            :Output, return or postcondition: Returns the max flow of the flow network, which is the same value returned by ford_fulkerson()
+
+            :Time complexity: O(|D|^2*|C|), where D is the number of data centres, and C is the number of communication channels
+
+                The distance from the source to the sink strictly increases after every phase, so there are at most O(D) phases. Within a phase, every
+                augmenting path saturates at least one edge and every retreat advances a current-arc pointer, which gives O(D*C) work per phase.
+
+            :Aux space complexity: O(D), where D is the number of data centres
+
+                The current augmenting path holds at most O(D) edges.
+
+        """
+        max_flow = 0
+
+        while self.bfs_levels(source, sink):
+            # Reset the current-arc pointers for the new level graph
+            for vertex in self.vertices:
+                vertex.current = 0
+
+            path = []
+            u = source
+            while True:
+                if u == sink:
+                    # Find the bottleneck of the path and push it through
+                    path_flow = min(edge.get_residual_capacity() for edge in path)
+                    for edge in path:
+                        edge.flow += path_flow
+                        edge.reverse.flow -= path_flow
+                    max_flow += path_flow
+
+                    # Retreat to the tail of the first saturated edge
+                    for i in range(len(path)):
+                        if path[i].get_residual_capacity() == 0:
+                            u = path[i].u
+                            del path[i:]
+                            break
+                    continue
+
+                # Advance along the current arc of u if it stays inside the level graph
+                current_vertex = self.vertices[u]
+                advanced = False
+                while current_vertex.current < len(current_vertex.edges):
+                    edge = current_vertex.edges[current_vertex.current]
+                    if edge.get_residual_capacity() > 0 and self.vertices[edge.v].level == current_vertex.level + 1:
+                        path.append(edge)
+                        u = edge.v
+                        advanced = True
+                        break
+                    current_vertex.current += 1
+
+                if not advanced:
+                    # Dead end, so u cannot reach the sink in this phase
+                    if u == source:
+                        break
+                    current_vertex.level = -1
+                    edge = path.pop()
+                    u = edge.u
+                    self.vertices[u].current += 1
+
+        return max_flow
+
     def reset_visited(self):
         """
             Function used to reset the visited vertices back to false
@@ -166,6 +344,7 @@ class Graph:
             if vertex:
                 vertex.visited = False
                 vertex.previous = 0
+                vertex.previous_edge = None
 
     def find_edge(self, u, v):
         """
@@ -189,6 +368,9 @@ class Vertex:
         self.discovered = False
         self.visited = False
         self.previous = 0
+        self.previous_edge = None
+        self.level = -1
+        self.current = 0
 
     def add_edge(self, edge):
         self.edges.append(edge)
@@ -209,6 +391,7 @@ class Edge:
         self.v = v
         self.capacity = capacity
         self.flow = 0
+        self.reverse = None
 
     def __str__(self):
         return_string = "(" + str(self.u) + ", " + str(self.v) + ", " + str(self.capacity) + ", " + str(self.flow) + ")"
@@ -221,243 +404,2431 @@ class Edge:
         """
         return self.capacity - self.flow
     
-def maxThroughput(connections, maxIn, maxOut, origin, targets):
+class ResidualGraph:
     """
-            Function description: 
-                This function is used to the find the max throughput of the flow network given all the necessary information. It updates the graph accordingly
-                so that we can use the Ford Fulkerson method to find the max flow.
+        Array backed residual graph used as a compact alternative to Graph, Vertex and Edge.
 
-            :Input:
-            argv1: The list of connections
-            argv2: The list of maxIn for each respective data centres
-            argv3: The list of maxOut for each respective data centres
-            argv4: The source vertex
-            argv5: The list of targets
+        Edges are stored in a forward star layout: head[u] is the first edge leaving u, next[e] is the edge after e in the same list, to[e] is the
+        vertex e points to, and capacity[e]/flow[e] hold its capacity and current flow. Every forward edge is stored at an even index 2k with its
+        reverse residual edge at 2k+1, so the partner of any edge e is simply e ^ 1 and augmenting costs O(1) per hop.
 
-            :Preconditions:
-                1. All the given inputs must be valid.
+    """
+    ENGINES = ("ford_fulkerson", "dinic", "push_relabel")
 
-            :Output, return or postcondition: Returns the max flow of the flow network
+    def __init__(self, vertices_count):
+        self.vertex_count = vertices_count * 2 + 2
+        self.head = array("i", [-1]) * self.vertex_count
+        self.next = array("i")
+        self.to = array("i")
+        self.capacity = array("q")
+        self.flow = array("q")
+
+    @classmethod
+    def from_arrays(cls, head, next_edge, to, capacity, flow):
+        """
+            Function used to wrap existing arrays (or memoryviews, e.g. over shared memory) as a ResidualGraph without copying them.
+        
+        """
+        graph = cls.__new__(cls)
+        graph.vertex_count = len(head)
+        graph.head = head
+        graph.next = next_edge
+        graph.to = to
+        graph.capacity = capacity
+        graph.flow = flow
+        return graph
+
+    @classmethod
+    def from_edge_lists(cls, vertices_count, tails, heads, capacities):
+        """
+            Function description: 
+                Bulk constructor that builds the same graph as calling add_edge(tails[k], heads[k], capacities[k]) for every k in order, but fills the
+                to and capacity columns with whole-array slice assignments and links the adjacency lists in a single pass over the edges.
 
-            :Time complexity: O(|D|*|C|^2), where D is the number of data centres, and C is the number of communication channels
+            :Input:
+            argv1: The number of data centres, as in __init__
+            argv2: The tails of the edges
+            argv3: The heads of the edges
+            argv4: The capacities of the edges
 
-                The main part of the complexity comes from the Ford-Fulkerson method, which dominates the complexity of the other parts of the function.
+            :Time complexity: O(D+C), where D is the number of data centres, and C is the number of edges
 
-            :Aux space complexity: O(C+D), where C is the number of communication channels
+        """
+        graph = cls(vertices_count)
+        edge_count = len(tails)
+
+        # Forward edges go at even indices and their reverse residual edges at odd indices
+        to = array("i", bytes(8 * edge_count))
+        to[0::2] = array("i", heads)
+        to[1::2] = array("i", tails)
+        capacity = array("q", bytes(16 * edge_count))
+        capacity[0::2] = array("q", capacities)
+
+        next_edge = array("i", bytes(8 * edge_count))
+        head = graph.head
+        for e in range(2 * edge_count):
+            u = to[e ^ 1]
+            next_edge[e] = head[u]
+            head[u] = e
+
+        graph.next = next_edge
+        graph.to = to
+        graph.capacity = capacity
+        graph.flow = array("q", bytes(16 * edge_count))
+        return graph
 
-                Since we are using an adjacency list, it will require space proportional to the number of communication channels and data centres to store
-                their values. We are technically using O((C*2+2) + D), but it simplifies back to O(C+D).
+    def __str__(self):
+        return_string = ""
+        for u in range(self.vertex_count):
+            return_string = return_string + "Vertex " + str(u)
+            e = self.head[u]
+            while e != -1:
+                if e % 2 == 0:
+                    return_string = return_string + "\n with edges (" + str(u) + ", " + str(self.to[e]) + ", " + str(self.capacity[e]) + ", " + str(self.flow[e]) + ")"
+                e = self.next[e]
+            return_string = return_string + "\n"
+        return return_string
 
+    def add_edge(self, u, v, capacity):
         """
-    # Determine the number of data centers
-    data_center_count = len(maxIn)
+            Function used to add the edge (u, v) together with its reverse residual edge (v, u). Returns the index of the forward edge.
+        
+        """
+        e = len(self.to)
 
-    capacity = []
-    for i in range(len(maxIn)):
-        capacity.append(min(maxIn[i], maxOut[i]))
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.flow.append(0)
+        self.next.append(self.head[u])
+        self.head[u] = e
 
-    # Create a graph instance
-    graph = Graph(data_center_count)
+        self.to.append(u)
+        self.capacity.append(0)
+        self.flow.append(0)
+        self.next.append(self.head[v])
+        self.head[v] = e + 1
 
-    # Add the communication channels to the graph
-    graph.add_edges([[i, i+data_center_count, maxOut[i]] for i in range(data_center_count)])
-    graph.add_edges([[connection[0]+data_center_count, connection[1], min(connection[2], capacity[connection[1]])] for connection in connections])
+        return e
 
-    # Create supersource and supersink vertices
-    supersource = data_center_count * 2
-    supersink = data_center_count * 2 + 1
+    def add_edges(self, edges):
+        for edge in edges:
+            self.add_edge(edge[0], edge[1], edge[2])
 
-    # Connect targets to supersink
-    for target in targets:
-        graph.add_edges([(target, supersink, maxOut[target])])
+    def get_residual_capacity(self, e):
+        """
+            Function used to calculate the residual capacity of edge e
+        
+        """
+        return self.capacity[e] - self.flow[e]
 
-    # Connect supersource to origin
-    graph.add_edges([(supersource, origin, maxOut[origin])])
+    def augment(self, e, amount):
+        """
+            Function used to push amount units of flow through edge e, cancelling the same amount on its reverse edge
+        
+        """
+        self.flow[e] += amount
+        self.flow[e ^ 1] -= amount
 
-    # Compute the maximum flow using Ford-Fulkerson algorithm
-    max_flow = graph.ford_fulkerson(supersource, supersink)
+    def bfs(self, source, sink, parent, stats=None):
+        """
+            Function description: 
+                Same as Graph.bfs, but it records the index of the edge used to reach each vertex in parent instead of setting flags on Vertex objects.
 
-    return max_flow
+            :Input:
+            argv1: The source
+            argv2: The sink
+            argv3: An array of size vertex_count that will be filled with the parent edge of every visited vertex (-1 if unvisited)
+            argv4: An optional FlowStatistics that the dequeued vertices and scanned edges are added to
 
-"""
+            :Output, return or postcondition: Returns true is a path does exist from source to sink; returns false is no path is found.
 
-    #########################################################################################################
-    #                                                                                                       #
-    #                                                catGPT                                                 #
-    #                                            Final Version                                              #
-    #                                                                                                       #
-    #########################################################################################################
-    
-"""
-class Node:
-    """
-    Node Class for Q2
-     - Each node will depict a char
+            :Time complexity: O(D+C), where D is the number of data centres, and C is the number of communication channels
 
-    """
-    def __init__(self, char=None, size=27):
-        """
-        Init for the Node class
-         - Initializes the variables for each node
-         - Note: max_frequency is the max frequency of the leaf node that will be saved in each node
+            :Aux space complexity: O(D), where D is the number of data centres
 
         """
-        self.char = char
-        self.link = [None] * size
-        self.frequency = 0
-        self.last = False
-        self.max_frequency = 0
-
-class CatsTrie:
-    """
-    Trie Class for Q2
-     - A trie class that encapsulates all of the cat sentences.
+        head = self.head
+        next_edge = self.next
+        to = self.to
+        capacity = self.capacity
+        flow = self.flow
+
+        for u in range(self.vertex_count):
+            parent[u] = -1
+        parent[source] = -2
+
+        queue = [source]
+        queue_head = 0
+        while queue_head < len(queue):
+            u = queue[queue_head]
+            queue_head += 1
+            if u == sink:
+                break
 
-    """
-    def __init__(self, sentences):
+            e = head[u]
+            while e != -1:
+                v = to[e]
+                if parent[v] == -1 and capacity[e] - flow[e] > 0:
+                    parent[v] = e
+                    queue.append(v)
+                e = next_edge[e]
+
+        if stats is not None:
+            stats.vertices_dequeued += queue_head
+            for u in queue[:queue_head]:
+                if u != sink:
+                    e = head[u]
+                    while e != -1:
+                        stats.edges_scanned += 1
+                        e = next_edge[e]
+
+        return parent[sink] != -1
+
+    def ford_fulkerson(self, source, sink, stats=None):
         """
             Function description: 
-                Initializes the CatsTrie by inserting and linking the nodes. During this process, it will update the nodes with their frequencies
-                and also note down whether it is the leaf node or not. It does so by first create the root node before building the rest of the
-                Trie using the build() function.
+                Same as Graph.ford_fulkerson, but every hop of the augmenting path is a constant time array access through the parent edge.
 
             :Input:
-            argv1: The list of sentences
+            argv1: The source
+            argv2: The sink
+            argv3: An optional FlowStatistics to record the search in
 
-            :Preconditions:
-                1. The list of sentences must contain at least one sentence.
+            :Output, return or postcondition: Returns the max flow of the flow network
 
-            :Output, return or postcondition: Builds a Trie that contains all the sentences, characters, and their frequencies.
+            :Time complexity: O(|D|*|C|^2), where D is the number of data centres, and C is the number of communication channels
 
-            :Time complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+            :Aux space complexity: O(D), where D is the number of data centres
 
-                During the initialization process, we will be inserting/updating the Trie at least N*M times. To be more accurate, we will be updating
-                the Trie N*T times, where T is the number of characters in each sentence.
+        """
+        to = self.to
+        max_flow = 0
+        parent = array("i", [-1]) * self.vertex_count
 
-            :Aux space complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+        while self.bfs(source, sink, parent, stats):
+            # Find the minimum residual capacity along the augmenting path
+            path_flow = float("inf")
+            v = sink
+            while v != source:
+                e = parent[v]
+                path_flow = min(path_flow, self.get_residual_capacity(e))
+                v = to[e ^ 1]
 
-                Similarly, we will also need approximately N*M amount of space to store all the information of the Trie. 
+            # Update the flow along the augmenting path
+            v = sink
+            while v != source:
+                e = parent[v]
+                self.augment(e, path_flow)
+                v = to[e ^ 1]
 
-        """
-        self.root = Node()
-        self.build(sentences)
+            max_flow += path_flow
+            if stats is not None:
+                stats.record_path(path_flow)
 
-    def build(self, sentences):
+        return max_flow
+
+    def bfs_levels(self, source, sink, level):
+        """
+            Function used by dinic() to fill level with the BFS distance of every vertex from the source in the residual graph (-1 if unreachable).
+            Returns true if the sink is reachable.
+        
+        """
+        head = self.head
+        next_edge = self.next
+        to = self.to
+        capacity = self.capacity
+        flow = self.flow
+
+        for u in range(self.vertex_count):
+            level[u] = -1
+        level[source] = 0
+
+        queue = [source]
+        queue_head = 0
+        while queue_head < len(queue):
+            u = queue[queue_head]
+            queue_head += 1
+
+            e = head[u]
+            while e != -1:
+                v = to[e]
+                if level[v] < 0 and capacity[e] - flow[e] > 0:
+                    level[v] = level[u] + 1
+                    queue.append(v)
+                e = next_edge[e]
+
+        return level[sink] >= 0
+
+    def dinic(self, source, sink):
         """
             Function description: 
-                For each sentence in sentences, it will insert them one by one into the Trie. Everything else, is explained in the documentation
-                for __init__.
+                Same as Graph.dinic, but the level graph, the current-arc pointers and the augmenting path are all kept in flat arrays of edge indices.
 
             :Input:
-            argv1: The list of sentences
+            argv1: The source
+            argv2: The sink
 
-            :Preconditions:
-                1. The list of sentences must contain at least one sentence.
+            :Output, return or postcondition: Returns the max flow of the flow network
 
-            :Time complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+            :Time complexity: O(|D|^2*|C|), where D is the number of data centres, and C is the number of communication channels
 
-                Calls insert for each sentence in sentences.
+            :Aux space complexity: O(D), where D is the number of data centres
 
         """
-        for sentence in sentences:
-            self.insert(sentence)
+        next_edge = self.next
+        to = self.to
+        capacity = self.capacity
+        flow = self.flow
 
-    def insert(self, key):
+        max_flow = 0
+        level = array("i", [-1]) * self.vertex_count
+
+        while self.bfs_levels(source, sink, level):
+            current = array("i", self.head)
+            path = []
+            u = source
+            while True:
+                if u == sink:
+                    # Push the bottleneck through the path, then retreat to the tail of the first saturated edge
+                    path_flow = min(capacity[e] - flow[e] for e in path)
+                    for e in path:
+                        flow[e] += path_flow
+                        flow[e ^ 1] -= path_flow
+                    max_flow += path_flow
+
+                    for i in range(len(path)):
+                        if capacity[path[i]] - flow[path[i]] == 0:
+                            u = to[path[i] ^ 1]
+                            del path[i:]
+                            break
+                    continue
+
+                # Advance along the current arc of u if it stays inside the level graph
+                e = current[u]
+                while e != -1:
+                    if capacity[e] - flow[e] > 0 and level[to[e]] == level[u] + 1:
+                        break
+                    e = next_edge[e]
+                current[u] = e
+
+                if e != -1:
+                    path.append(e)
+                    u = to[e]
+                else:
+                    # Dead end, so u cannot reach the sink in this phase
+                    if u == source:
+                        break
+                    level[u] = -1
+                    e = path.pop()
+                    u = to[e ^ 1]
+                    current[u] = next_edge[current[u]]
+
+        return max_flow
+
+    def global_relabel(self, source, sink, height, count, current):
         """
             Function description: 
-                Recursively calls itself to insert each characters of a sentence.
+                Global relabelling heuristic used by push_relabel(). Sets every height to its exact residual distance to the sink with a reverse BFS.
+                Vertices that can no longer reach the sink get n plus their residual distance to the source instead, so that their excess flows back.
+                Vertices that reach neither keep a height of 2n. The vertex counts per height and the current arcs are rebuilt to match.
 
-        """
-        self.insert_recursive(key, self.root, 0)
+            :Time complexity: O(D+C), where D is the number of data centres, and C is the number of communication channels
 
-    def insert_recursive(self, key, current, key_pos):
+        """
+        n = self.vertex_count
+        head = self.head
+        next_edge = self.next
+        to = self.to
+        capacity = self.capacity
+        flow = self.flow
+
+        for u in range(n):
+            height[u] = 2 * n
+            current[u] = head[u]
+        for h in range(len(count)):
+            count[h] = 0
+
+        height[sink] = 0
+        height[source] = n
+        for root in (sink, source):
+            queue = [root]
+            queue_head = 0
+            while queue_head < len(queue):
+                v = queue[queue_head]
+                queue_head += 1
+
+                # Edge e goes from v to w, so its reverse edge e ^ 1 goes from w to v
+                e = head[v]
+                while e != -1:
+                    w = to[e]
+                    if height[w] == 2 * n and capacity[e ^ 1] - flow[e ^ 1] > 0:
+                        height[w] = height[v] + 1
+                        queue.append(w)
+                    e = next_edge[e]
+
+        for u in range(n):
+            count[height[u]] += 1
+
+    def push_relabel(self, source, sink):
         """
             Function description: 
-                Recursive function used by insert to create the nodes and update them until it reaches the base case (leaf node) and sets last as true
-                for that particular node. It will also update the max_frequency on the way up the recursion with the frequency of the leaf node with
-                the highest frequency. This will be used later on to traverse down the trie to obtain the most frequency word that can autocomplete
-                the prompt given to us.
+                Highest-label push-relabel method used to find the max flow within the flow network. Instead of searching for augmenting paths, it
+                saturates every edge leaving the source and then repeatedly discharges the active vertex (a vertex with excess flow) with the highest
+                label, pushing excess along admissible edges and relabelling a vertex once none are left. This performs much better than the
+                augmenting path engines on dense meshes, where each BFS would scan almost every edge.
 
-            :Input:
-            argv1: The key that needs to be inserted into the trie data structure
-            argv2: The current node of the trie where the insertion is being performed
-            argv3: The integer keeping track of the current position of the key 
+                Two heuristics are used:
+                    1. Gap relabelling: when no vertex is left at some height h < n, every vertex above h can no longer reach the sink, so they are
+                       lifted to n + 1 at once instead of one relabel at a time.
+                    2. Global relabelling: after every n relabels, the heights are recomputed exactly with global_relabel().
 
-            :Time complexity: O(M), M is the length of the sentence.
-                Inserts or updates the nodes depending of which character it reads M times.
+                The excess that cannot reach the sink is returned to the source, so the flow array holds a valid flow when this function returns.
 
-        """
-        if key_pos == len(key):
-            current.frequency += 1
-            current.last = True
-            current.max_frequency = current.frequency
-            return
+            :Input:
+            argv1: The source
+            argv2: The sink
 
-        char = key[key_pos]
-        index = ord(char) - 97 + 1
+            :Preconditions:
+                1. The source and sink must be given and valid
 
-        if current.link[index] is None:
-            current.link[index] = Node(char)
+            :Output, return or postcondition: Returns the max flow of the flow network
 
-        child = current.link[index]
-        self.insert_recursive(key, child, key_pos + 1)
-        current.max_frequency = child.max_frequency
-        
-    def findHighestFrequencyWord(self, current, prefix, highest_freq, highest_word):
-        """
-            Function description: 
-                Finds the highest frequency word for the autoComplete method. This function checks through every child starting from the children of the prefix
-                node for the max_frequency. If the max frequency of the child is greater than the current max frequency, we will traverse down the direction of
-                that child node. By referring to this max_frequency variable, we can effectively traverse down the path that will lead us to the most frequent
-                sentence in sentences that can autocomplete the given prompt.
+            :Time complexity: O(|D|^2*sqrt(|C|)), where D is the number of data centres, and C is the number of communication channels
 
-            :Input:
-            argv1: The current node
-            argv2: The entire prefix
-            argv3: The highest frequency so far
-            argv4: The word with the highest frequency so far
+                This is the standard bound for the highest-label selection rule. The heuristics do not improve the bound but make the method
+                much faster in practice.
 
-            :Preconditions:
-                1. There needs to be at least one node.
-                2. There needs to be some prefix.
-                3. It needs to be given the highest recorded frequency so far.
-                4. It needs to be given the word with the highest frequency so far.
+            :Aux space complexity: O(D), where D is the number of data centres
 
-            :Output, return or postcondition: Returns either the prefix or the prefix + the rest of the characters that makes up the most frequent sentence
-                                                in sentences.
+                The heights, excesses, current arcs and buckets of active vertices are all proportional to the number of vertices.
 
-            :Time complexity: O(Y), where Y is the length of the most frequent sentence in sentences that begins with the prompt, unless such a prompt does not 
-                                        exist (in which case findHighestFrequencyWord() should have a time complexity of O(1)). Thus, this is an output sensitive 
-                                        complexity.
+        """
+        n = self.vertex_count
+        head = self.head
+        next_edge = self.next
+        to = self.to
+        capacity = self.capacity
+        flow = self.flow
+
+        height = array("i", [0]) * n
+        excess = array("q", [0]) * n
+        count = array("i", [0]) * (2 * n + 1)
+        current = array("i", head)
+        buckets = [[] for _ in range(2 * n + 1)]
+
+        # Saturate every edge leaving the source
+        e = head[source]
+        while e != -1:
+            residual = capacity[e] - flow[e]
+            if residual > 0:
+                flow[e] += residual
+                flow[e ^ 1] -= residual
+                excess[to[e]] += residual
+                excess[source] -= residual
+            e = next_edge[e]
+
+        relabels = n
+        highest = -1
+        while True:
+            if relabels >= n:
+                # Periodic global relabel, followed by rebuilding the buckets of active vertices
+                self.global_relabel(source, sink, height, count, current)
+                relabels = 0
+                for bucket in buckets:
+                    bucket.clear()
+                highest = -1
+                for u in range(n):
+                    if excess[u] > 0 and u != source and u != sink and height[u] < 2 * n:
+                        buckets[height[u]].append(u)
+                        highest = max(highest, height[u])
+
+            # Find the active vertex with the highest label
+            while highest >= 0 and not buckets[highest]:
+                highest -= 1
+            if highest < 0:
+                break
+            u = buckets[highest].pop()
+            if excess[u] == 0 or height[u] != highest:
+                continue
+
+            # Discharge u
+            while excess[u] > 0:
+                e = current[u]
+                if e == -1:
+                    # Relabel u to one more than its lowest residual neighbour
+                    old_height = height[u]
+                    new_height = 2 * n
+                    e = head[u]
+                    while e != -1:
+                        if capacity[e] - flow[e] > 0 and height[to[e]] + 1 < new_height:
+                            new_height = height[to[e]] + 1
+                        e = next_edge[e]
+                    relabels += 1
+
+                    count[old_height] -= 1
+                    if count[old_height] == 0 and old_height < n:
+                        # Gap heuristic
+                        for v in range(n):
+                            if old_height < height[v] < n:
+                                count[height[v]] -= 1
+                                height[v] = n + 1
+                                count[n + 1] += 1
+                                current[v] = head[v]
+                                if excess[v] > 0 and v != sink:
+                                    buckets[n + 1].append(v)
+                                    highest = max(highest, n + 1)
+                        new_height = max(new_height, n + 1)
+
+                    height[u] = new_height
+                    count[new_height] += 1
+                    current[u] = head[u]
+                    if new_height >= 2 * n:
+                        break
+                    continue
+
+                v = to[e]
+                residual = capacity[e] - flow[e]
+                if residual > 0 and height[u] == height[v] + 1:
+                    # Push as much of the excess as possible through e
+                    amount = min(excess[u], residual)
+                    flow[e] += amount
+                    flow[e ^ 1] -= amount
+                    excess[u] -= amount
+                    if excess[v] == 0 and v != source and v != sink:
+                        buckets[height[v]].append(v)
+                    excess[v] += amount
+                else:
+                    current[u] = next_edge[e]
+
+            highest = max(highest, height[u])
+
+        return excess[sink]
+
+    def augment_limited(self, start, end, limit):
+        """
+            Function used to push up to limit units of flow from start to end along augmenting paths in the residual graph. Vertices in between keep
+            their balance, so this can be used to move excess flow from one vertex to another. Returns the amount of flow that was actually pushed.
 
-                This function will always assume the trie traversal is already at the desired prefix node. By only storing the max_frequency amongst all leaf
-                nodes below the prefix node, we can easily traverse down only the children with the highest max_frequency. Since we previously updated the
-                max_frequency variable to be the highest frequency of a particular leaf node, we can easily traverse down to obtain characters that make up
-                the most frequent sentence in sentences by simply following the one child node with the highest max_frequency rather than manually traversing down 
-                to each leaf node from the children of the prefix node.
+            :Time complexity: O(P*(D+C)), where P is the number of augmenting paths used
 
         """
-        if current.last and current.frequency > highest_freq:
-            highest_freq = current.frequency
-            highest_word = prefix
+        to = self.to
+        pushed = 0
+        parent = array("i", [-1]) * self.vertex_count
 
-        max_child_freq = 0
-        max_child_index = -1
+        while pushed < limit and self.bfs(start, end, parent):
+            path_flow = limit - pushed
+            v = end
+            while v != start:
+                e = parent[v]
+                path_flow = min(path_flow, self.get_residual_capacity(e))
+                v = to[e ^ 1]
 
-        for index in range(len(current.link)):
-            child = current.link[index]
-            if child is not None:
-                if child.max_frequency > max_child_freq:
-                    max_child_freq = child.max_frequency
-                    max_child_index = index
+            v = end
+            while v != start:
+                e = parent[v]
+                self.augment(e, path_flow)
+                v = to[e ^ 1]
 
-        if max_child_index != -1:
-            child = current.link[max_child_index]
-            char = chr(max_child_index + 97 - 1)
-            word = prefix + char
-            highest_freq, highest_word = self.findHighestFrequencyWord(child, word, highest_freq, highest_word)
+            pushed += path_flow
 
-        return highest_freq, highest_word
+        return pushed
+
+    def update_capacity(self, e, capacity, source, sink):
+        """
+            Function description: 
+                Changes the capacity of edge e and repairs the current max flow instead of recomputing it from scratch. If the edge now carries more
+                flow than its new capacity, the surplus is first rerouted around the edge, and whatever cannot be rerouted is cancelled back to the
+                source and from the sink. The flow is then topped up again with dinic(), which starts from the repaired flow.
+
+            :Input:
+            argv1: The edge index
+            argv2: The new capacity of the edge
+            argv3: The source
+            argv4: The sink
+
+            :Preconditions:
+                1. The flow array must hold a valid max flow from source to sink
+
+            :Output, return or postcondition: Returns the change in the max flow caused by the new capacity
+
+            :Time complexity: O(P*(D+C)) for the repair, where P is the number of augmenting paths needed, plus the dinic() phases that are needed to
+                                top the flow up again. Both are usually far smaller than a full solve.
+
+        """
+        to = self.to
+        self.capacity[e] = capacity
+
+        cancelled = 0
+        surplus = self.flow[e] - capacity
+        if surplus > 0:
+            self.flow[e] = capacity
+            self.flow[e ^ 1] = -capacity
+
+            # The tail of e now has surplus inflow and the head of e is short by the same amount
+            u = to[e ^ 1]
+            v = to[e]
+            surplus -= self.augment_limited(u, v, surplus)
+            if surplus > 0:
+                if u != source:
+                    self.augment_limited(u, source, surplus)
+                if v != sink:
+                    self.augment_limited(sink, v, surplus)
+                cancelled = surplus
+
+        return self.dinic(source, sink) - cancelled
+
+class VertexCapacityGraph:
+    """
+        Flow network that enforces the capacity of every data centre directly, instead of splitting each data centre into an in vertex and an out
+        vertex joined by an internal edge like Graph and ResidualGraph do.
+
+        Only the communication channels are stored as edges, in the same paired forward star layout as ResidualGraph. The capacity of data centre v
+        and the flow currently going through it are kept in vertex_capacity[v] and vertex_flow[v]. The supersource and supersink are not stored at
+        all: source_capacity[v] and sink_capacity[v] hold the capacity of the edge from the supersource into v and from v to the supersink.
+
+        The augmenting path search still needs to know whether it entered a data centre on its in side or its out side, so it runs on 2 states per
+        data centre, but those states only exist inside the search. This halves the memory stored for the data centres, but not the work of a
+        search, which can visit as many states as the node split graph has vertices. Solving is not faster than on ResidualGraph, and is usually
+        slower since every state needs more checks: about 1.8x on a 20k channel layered topology.
+
+    """
+    ENGINES = ("ford_fulkerson",)
+
+    def __init__(self, vertices_count):
+        self.data_center_count = vertices_count
+        self.vertex_count = vertices_count + 2
+        self.head = array("i", [-1]) * vertices_count
+        self.next = array("i")
+        self.to = array("i")
+        self.capacity = array("q")
+        self.flow = array("q")
+        self.vertex_capacity = array("q", [0]) * vertices_count
+        self.vertex_flow = array("q", [0]) * vertices_count
+        self.source_capacity = array("q", [0]) * vertices_count
+        self.source_flow = array("q", [0]) * vertices_count
+        self.sink_capacity = array("q", [0]) * vertices_count
+        self.sink_flow = array("q", [0]) * vertices_count
+
+    def add_edge(self, u, v, capacity):
+        """
+            Function used to add the channel from the out side of u to the in side of v, together with its reverse residual edge. Returns the index of
+            the forward edge.
+        
+        """
+        e = len(self.to)
+
+        self.to.append(v)
+        self.capacity.append(capacity)
+        self.flow.append(0)
+        self.next.append(self.head[u])
+        self.head[u] = e
+
+        self.to.append(u)
+        self.capacity.append(0)
+        self.flow.append(0)
+        self.next.append(self.head[v])
+        self.head[v] = e + 1
+
+        return e
+
+    def add_edges(self, edges):
+        for edge in edges:
+            self.add_edge(edge[0], edge[1], edge[2])
+
+    def bfs(self, parent_state, parent_edge, origins, queue, stats=None):
+        """
+            Function description: 
+                Breadth First Search over the residual graph with vertex capacities. State 2v is the in side of data centre v and state 2v+1 its out
+                side. From the in side the search can cross the data centre if it still has spare capacity, follow a reverse channel edge (cancelling
+                flow that came in) or reach the supersink. From the out side it can follow a forward channel edge, or cross back to the in side if flow
+                is going through the data centre.
+
+                Nothing is done per data centre that the search does not reach: the starting points come from the list of origins, and parent_state
+                must be -1 on entry everywhere except for the states that were queued, which the caller resets once it has used the path.
+
+            :Input:
+            argv1: An array of size 2D, -1 for every state, that will be filled with the state each state was reached from
+            argv2: An array of size 2D that will be filled with the channel edge used to reach each state (-1 for a crossing or the supersource)
+            argv3: The data centres with an edge from the supersource
+            argv4: An empty list that will be filled with the states reached, in the order they were queued
+            argv5: An optional FlowStatistics that the dequeued states and scanned edges are added to
+
+            :Output, return or postcondition: Returns the in side state from which the supersink was reached, or -1 if the supersink is unreachable.
+
+            :Time complexity: O(R+C_R), where R is the number of states reached and C_R the number of channels leaving them, at most O(D+C) where D
+                                is the number of data centres, and C is the number of communication channels
+
+            :Aux space complexity: O(D), where D is the number of data centres
+
+        """
+        head = self.head
+        next_edge = self.next
+        to = self.to
+        capacity = self.capacity
+        flow = self.flow
+        vertex_capacity = self.vertex_capacity
+        vertex_flow = self.vertex_flow
+
+        # Every origin with spare capacity from the supersource is a starting point
+        for v in origins:
+            if self.source_capacity[v] - self.source_flow[v] > 0:
+                parent_state[2 * v] = -2
+                parent_edge[2 * v] = -1
+                queue.append(2 * v)
+
+        found = -1
+        queue_head = 0
+        while queue_head < len(queue):
+            state = queue[queue_head]
+            queue_head += 1
+            v = state >> 1
+
+            if state & 1 == 0:
+                if self.sink_capacity[v] - self.sink_flow[v] > 0:
+                    found = state
+                    break
+
+                # Cross the data centre
+                if vertex_capacity[v] - vertex_flow[v] > 0 and parent_state[state + 1] == -1:
+                    parent_state[state + 1] = state
+                    parent_edge[state + 1] = -1
+                    queue.append(state + 1)
+
+                # Reverse channel edges leave from the in side and arrive at the out side
+                e = head[v]
+                while e != -1:
+                    if e & 1 and capacity[e] - flow[e] > 0:
+                        next_state = 2 * to[e] + 1
+                        if parent_state[next_state] == -1:
+                            parent_state[next_state] = state
+                            parent_edge[next_state] = e
+                            queue.append(next_state)
+                    e = next_edge[e]
+            else:
+                # Cross back through the data centre, cancelling flow that went through it
+                if vertex_flow[v] > 0 and parent_state[state - 1] == -1:
+                    parent_state[state - 1] = state
+                    parent_edge[state - 1] = -1
+                    queue.append(state - 1)
+
+                # Forward channel edges leave from the out side and arrive at the in side
+                e = head[v]
+                while e != -1:
+                    if not e & 1 and capacity[e] - flow[e] > 0:
+                        next_state = 2 * to[e]
+                        if parent_state[next_state] == -1:
+                            parent_state[next_state] = state
+                            parent_edge[next_state] = e
+                            queue.append(next_state)
+                    e = next_edge[e]
+
+        if stats is not None:
+            stats.vertices_dequeued += queue_head
+            for state in queue[:queue_head]:
+                if state != found:
+                    e = head[state >> 1]
+                    while e != -1:
+                        stats.edges_scanned += 1
+                        e = next_edge[e]
+
+        return found
+
+    def ford_fulkerson(self, source=None, sink=None, stats=None):
+        """
+            Function description: 
+                Same as ResidualGraph.ford_fulkerson, but the capacity of every data centre is enforced while augmenting rather than by an internal edge.
+                The source and sink are only accepted so that this has the same interface as the other engines, since the supersource and supersink are
+                implied by source_capacity and sink_capacity.
+
+            :Output, return or postcondition: Returns the max flow of the flow network, which is the same value as on the node split graph
+
+            :Time complexity: O(|D|*|C|^2), where D is the number of data centres, and C is the number of communication channels
+
+            :Aux space complexity: O(D), where D is the number of data centres
+
+        """
+        max_flow = 0
+        parent_state = array("i", [-1]) * (2 * self.data_center_count)
+        parent_edge = array("i", [-1]) * (2 * self.data_center_count)
+        origins = [v for v in range(self.data_center_count) if self.source_capacity[v] > 0]
+        queue = []
+
+        while True:
+            for state in queue:
+                parent_state[state] = -1
+            queue.clear()
+
+            last = self.bfs(parent_state, parent_edge, origins, queue, stats)
+            if last == -1:
+                break
+
+            # Find the bottleneck, starting with the edge to the supersink and walking back to the supersource
+            path_flow = self.sink_capacity[last >> 1] - self.sink_flow[last >> 1]
+            state = last
+            while parent_state[state] != -2:
+                previous = parent_state[state]
+                e = parent_edge[state]
+                if e != -1:
+                    path_flow = min(path_flow, self.capacity[e] - self.flow[e])
+                elif state & 1:
+                    path_flow = min(path_flow, self.vertex_capacity[state >> 1] - self.vertex_flow[state >> 1])
+                else:
+                    path_flow = min(path_flow, self.vertex_flow[state >> 1])
+                state = previous
+            path_flow = min(path_flow, self.source_capacity[state >> 1] - self.source_flow[state >> 1])
+
+            # Update the flow along the path
+            self.sink_flow[last >> 1] += path_flow
+            state = last
+            while parent_state[state] != -2:
+                previous = parent_state[state]
+                e = parent_edge[state]
+                if e != -1:
+                    self.flow[e] += path_flow
+                    self.flow[e ^ 1] -= path_flow
+                elif state & 1:
+                    self.vertex_flow[state >> 1] += path_flow
+                else:
+                    self.vertex_flow[state >> 1] -= path_flow
+                state = previous
+            self.source_flow[state >> 1] += path_flow
+
+            max_flow += path_flow
+            if stats is not None:
+                stats.record_path(path_flow)
+
+        return max_flow
+
+FLOW_BACKENDS = {"graph": Graph, "array": ResidualGraph, "vertex": VertexCapacityGraph}
+
+def read_connections_csv(path, delimiter=","):
+    """
+        Function used to stream (u, v, capacity) rows from a CSV file without loading the whole file. A header row, if present, is skipped.
+
+    """
+    with open(path, newline="") as file:
+        reader = csv.reader(file, delimiter=delimiter)
+        for row in reader:
+            if not row:
+                continue
+            try:
+                yield int(row[0]), int(row[1]), int(row[2])
+            except ValueError:
+                if reader.line_num == 1:
+                    continue
+                raise
+
+def merge_channels(channels):
+    """
+        Function used to merge parallel channels, i.e. channels with the same (u, v), into one channel whose capacity is the sum of theirs. The merged
+        channels keep the order in which each (u, v) first appears.
+
+        :Time complexity: O(C), where C is the number of communication channels
+
+    """
+    merged = {}
+    for u, v, capacity in channels:
+        merged[(u, v)] = merged.get((u, v), 0) + capacity
+    return [(u, v, capacity) for (u, v), capacity in merged.items()]
+
+def build_throughput_graph(connections, maxIn, maxOut, origin, targets, graph_class=Graph, merge_parallel=False):
+    """
+        Function used to build the node split flow network used by maxThroughput, using either Graph or ResidualGraph as graph_class.
+        Returns the graph together with its supersource and supersink. With VertexCapacityGraph as graph_class, the same network is built without
+        node splitting, and the supersource and supersink returned are only placeholders.
+
+        connections can be any iterable of (u, v, capacity) rows, including a generator such as read_connections_csv() or a NumPy array of shape
+        (C, 3). Each channel is capped by the capacity of the data centre it goes to before parallel channels are merged, so merge_parallel never
+        changes the max flow, it only removes duplicate edges from every search. ResidualGraph is built in bulk with from_edge_lists().
+
+    """
+    # Determine the number of data centers
+    data_center_count = len(maxIn)
+
+    capacity = []
+    for i in range(len(maxIn)):
+        capacity.append(min(maxIn[i], maxOut[i]))
+
+    # NumPy arrays are much faster to iterate once converted to lists
+    if hasattr(connections, "tolist"):
+        connections = connections.tolist()
+
+    # Work out the communication channels of the graph
+    channels = ((connection[0]+data_center_count, connection[1], min(connection[2], capacity[connection[1]])) for connection in connections)
+    if merge_parallel:
+        channels = merge_channels(channels)
+
+    # Create supersource and supersink vertices
+    supersource = data_center_count * 2
+    supersink = data_center_count * 2 + 1
+
+    if graph_class is VertexCapacityGraph:
+        graph = VertexCapacityGraph(data_center_count)
+        graph.vertex_capacity = array("q", maxOut)
+        graph.add_edges((u - data_center_count, v, channel_capacity) for u, v, channel_capacity in channels)
+        for target in targets:
+            graph.sink_capacity[target] += maxOut[target]
+        graph.source_capacity[origin] += maxOut[origin]
+        return graph, graph.data_center_count, graph.data_center_count + 1
+
+    if graph_class is ResidualGraph:
+        tails = array("i", range(data_center_count))
+        heads = array("i", range(data_center_count, data_center_count * 2))
+        capacities = array("q", maxOut)
+        for u, v, channel_capacity in channels:
+            tails.append(u)
+            heads.append(v)
+            capacities.append(channel_capacity)
+        for target in targets:
+            tails.append(target)
+            heads.append(supersink)
+            capacities.append(maxOut[target])
+        tails.append(supersource)
+        heads.append(origin)
+        capacities.append(maxOut[origin])
+
+        return ResidualGraph.from_edge_lists(data_center_count, tails, heads, capacities), supersource, supersink
+
+    # Create a graph instance
+    graph = graph_class(data_center_count)
+
+    # Add the communication channels to the graph
+    graph.add_edges([[i, i+data_center_count, maxOut[i]] for i in range(data_center_count)])
+    graph.add_edges(channels)
+
+    # Connect targets to supersink
+    for target in targets:
+        graph.add_edges([(target, supersink, maxOut[target])])
+
+    # Connect supersource to origin
+    graph.add_edges([(supersource, origin, maxOut[origin])])
+
+    return graph, supersource, supersink
+
+def maxThroughput(connections, maxIn, maxOut, origin, targets, engine="ford_fulkerson", backend="graph", merge_parallel=False, stats=False):
+    """
+            Function description: 
+                This function is used to the find the max throughput of the flow network given all the necessary information. It updates the graph accordingly
+                so that we can use the Ford Fulkerson method to find the max flow.
+
+            :Input:
+            argv1: The list of connections
+            argv2: The list of maxIn for each respective data centres
+            argv3: The list of maxOut for each respective data centres
+            argv4: The source vertex
+            argv5: The list of targets
+            argv6: The max flow engine, "ford_fulkerson" (default), "dinic" or "push_relabel" (array backend only)
+            argv7: The graph backend, "graph" (default, Graph/Vertex/Edge objects), "array" (ResidualGraph) or "vertex" (VertexCapacityGraph)
+            argv8: Whether to merge parallel channels into one edge first, see build_throughput_graph()
+            argv9: Whether to also return a FlowStatistics. The search counters are only collected by the ford_fulkerson engine; the build and
+                   solve times are recorded for every engine.
+
+            :Preconditions:
+                1. All the given inputs must be valid.
+
+            :Output, return or postcondition: Returns the max flow of the flow network. Every engine returns the same value. With stats=True,
+                                                returns (max_flow, FlowStatistics) instead.
+
+            :Time complexity: O(|D|*|C|^2), where D is the number of data centres, and C is the number of communication channels
+
+                The main part of the complexity comes from the Ford-Fulkerson method, which dominates the complexity of the other parts of the function.
+                With engine="dinic" the solve is O(|D|^2*|C|) instead.
+
+            :Aux space complexity: O(C+D), where C is the number of communication channels
+
+                Since we are using an adjacency list, it will require space proportional to the number of communication channels and data centres to store
+                their values. We are technically using O((C*2+2) + D), but it simplifies back to O(C+D).
+
+        """
+    if backend not in FLOW_BACKENDS:
+        raise ValueError("backend must be one of " + ", ".join(FLOW_BACKENDS))
+    graph_class = FLOW_BACKENDS[backend]
+    if engine not in graph_class.ENGINES:
+        raise ValueError("engine must be one of " + ", ".join(graph_class.ENGINES) + " for the " + backend + " backend")
+
+    if not stats:
+        # Build the node split flow network
+        graph, supersource, supersink = build_throughput_graph(connections, maxIn, maxOut, origin, targets, graph_class, merge_parallel)
+
+        # Compute the maximum flow using the selected engine
+        max_flow = getattr(graph, engine)(supersource, supersink)
+
+        return max_flow
+
+    statistics = FlowStatistics()
+
+    start = time.perf_counter()
+    graph, supersource, supersink = build_throughput_graph(connections, maxIn, maxOut, origin, targets, graph_class, merge_parallel)
+    statistics.build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if engine == "ford_fulkerson":
+        max_flow = graph.ford_fulkerson(supersource, supersink, statistics)
+    else:
+        max_flow = getattr(graph, engine)(supersource, supersink)
+    statistics.solve_time = time.perf_counter() - start
+
+    return max_flow, statistics
+
+class ThroughputSession:
+    """
+        Stateful version of maxThroughput that keeps its residual graph between calls, so that changing one channel or one target only repairs the
+        flow where needed instead of rebuilding the node split graph and rerunning every augmenting path.
+
+        Every data centre gets an edge to the supersink up front, with a capacity of 0 unless it is a target, so adding or removing a target is just
+        a capacity change on that edge.
+
+    """
+    def __init__(self, connections, maxIn, maxOut, origin, targets, engine="dinic"):
+        """
+            Function description: 
+                Builds the same node split flow network as maxThroughput on a ResidualGraph, keeping the index of every channel and target edge, and
+                computes the initial max flow with the given engine.
+
+            :Input:
+            argv1: The list of connections
+            argv2: The list of maxIn for each respective data centres
+            argv3: The list of maxOut for each respective data centres
+            argv4: The source vertex
+            argv5: The list of targets
+            argv6: The ResidualGraph engine used for the initial solve
+
+            :Time complexity: O(C+D) to build the graph, plus the complexity of the chosen engine
+
+        """
+        if engine not in ResidualGraph.ENGINES:
+            raise ValueError("engine must be one of " + ", ".join(ResidualGraph.ENGINES))
+
+        self.data_center_count = len(maxIn)
+        self.maxOut = list(maxOut)
+        self.capacity = [min(maxIn[i], maxOut[i]) for i in range(self.data_center_count)]
+
+        n = self.data_center_count
+        self.graph = ResidualGraph(n)
+        self.supersource = n * 2
+        self.supersink = n * 2 + 1
+
+        for i in range(n):
+            self.graph.add_edge(i, i + n, maxOut[i])
+
+        # Keep every edge of a channel so that set_capacity() can find it in O(1)
+        self.channels = {}
+        self.connection_edges = []
+        for connection in connections:
+            u, v = connection[0], connection[1]
+            e = self.graph.add_edge(u + n, v, min(connection[2], self.capacity[v]))
+            self.channels.setdefault((u, v), []).append(e)
+            self.connection_edges.append(e)
+
+        target_set = set(targets)
+        self.target_edges = [self.graph.add_edge(i, self.supersink, maxOut[i] if i in target_set else 0) for i in range(n)]
+        self.graph.add_edge(self.supersource, origin, maxOut[origin])
+
+        self.max_flow = getattr(self.graph, engine)(self.supersource, self.supersink)
+
+    def set_capacity(self, u, v, c):
+        """
+            Function description: 
+                Sets the capacity of the channel from data centre u to data centre v to c and repairs the max flow. Parallel channels between u and v
+                are treated as one channel, so afterwards the pair carries at most c. A channel that does not exist yet is added.
+
+            :Input:
+            argv1: The data centre the channel leaves from
+            argv2: The data centre the channel goes to
+            argv3: The new capacity of the channel
+
+            :Output, return or postcondition: Returns the new max flow
+
+            :Time complexity: See ResidualGraph.update_capacity()
+
+        """
+        n = self.data_center_count
+        capacity = min(c, self.capacity[v])
+
+        if (u, v) not in self.channels:
+            self.channels[(u, v)] = [self.graph.add_edge(u + n, v, 0)]
+
+        edges = self.channels[(u, v)]
+        for e in edges[1:]:
+            self.max_flow += self.graph.update_capacity(e, 0, self.supersource, self.supersink)
+        self.max_flow += self.graph.update_capacity(edges[0], capacity, self.supersource, self.supersink)
+
+        return self.max_flow
+
+    def add_target(self, t):
+        """
+            Function used to add data centre t to the targets and augment the max flow through it. Returns the new max flow.
+        
+        """
+        self.max_flow += self.graph.update_capacity(self.target_edges[t], self.maxOut[t], self.supersource, self.supersink)
+        return self.max_flow
+
+    def remove_target(self, t):
+        """
+            Function used to remove data centre t from the targets, cancelling or rerouting the flow that went through it. Returns the new max flow.
+        
+        """
+        self.max_flow += self.graph.update_capacity(self.target_edges[t], 0, self.supersource, self.supersink)
+        return self.max_flow
+
+class ThroughputIndex:
+    """
+        A node split flow network built once from a fixed list of connections, maxIn and maxOut, which can then answer many maxThroughput queries for
+        different origins and targets without rebuilding the graph.
+
+        Every data centre gets an edge from the supersource and an edge to the supersink up front, both with a capacity of 0. A query only resets the
+        flow array and sets the capacities of the edges of its origin and targets.
+
+    """
+    def __init__(self, connections, maxIn, maxOut):
+        """
+            Function description: 
+                Builds the node split flow network on a ResidualGraph in the same way as maxThroughput, plus one supersource and one supersink edge
+                for every data centre.
+
+            :Input:
+            argv1: The list of connections
+            argv2: The list of maxIn for each respective data centres
+            argv3: The list of maxOut for each respective data centres
+
+            :Time complexity: O(C+D), where D is the number of data centres, and C is the number of communication channels
+
+        """
+        n = len(maxIn)
+        self.maxOut = array("q", maxOut)
+        self.graph = ResidualGraph(n)
+        self.supersource = n * 2
+        self.supersink = n * 2 + 1
+
+        for i in range(n):
+            self.graph.add_edge(i, i + n, maxOut[i])
+        for connection in connections:
+            v = connection[1]
+            self.graph.add_edge(connection[0] + n, v, min(connection[2], maxIn[v], maxOut[v]))
+
+        self.source_edges = array("i", [self.graph.add_edge(self.supersource, i, 0) for i in range(n)])
+        self.target_edges = array("i", [self.graph.add_edge(i, self.supersink, 0) for i in range(n)])
+        self.active_edges = []
+
+    def query(self, origin, targets, engine="dinic"):
+        """
+            Function description: 
+                Returns the same value as maxThroughput(connections, maxIn, maxOut, origin, targets), reusing the graph built in __init__.
+
+            :Input:
+            argv1: The source vertex
+            argv2: The list of targets
+            argv3: The ResidualGraph engine to use
+
+            :Time complexity: O(C+D) to reset the flow and rewire the supersource and supersink, plus the complexity of the chosen engine
+
+        """
+        if engine not in ResidualGraph.ENGINES:
+            raise ValueError("engine must be one of " + ", ".join(ResidualGraph.ENGINES))
+
+        graph = self.graph
+        self.reset()
+        self.active_edges = [self.source_edges[origin]] + [self.target_edges[target] for target in targets]
+
+        graph.capacity[self.source_edges[origin]] = self.maxOut[origin]
+        for target in targets:
+            graph.capacity[self.target_edges[target]] = self.maxOut[target]
+
+        return getattr(graph, engine)(self.supersource, self.supersink)
+
+    def query_multi(self, origins, targets, supplies=None, engine="dinic"):
+        """
+            Function description: 
+                Multi-origin version of query(). Every origin is wired to the supersource with its own supply cap and a single max flow problem is
+                solved, so flow from different origins shares the channels it competes for instead of being counted once per origin.
+
+            :Input:
+            argv1: The list of origins
+            argv2: The list of targets
+            argv3: The supply cap of each origin, in the same order as origins. Defaults to maxOut of each origin, as in maxThroughput.
+            argv4: The ResidualGraph engine to use
+
+            :Output, return or postcondition: Returns (max_flow, contributions), where contributions maps each origin to the part of the max flow
+                                                that leaves from it
+
+            :Time complexity: O(C+D) to reset the flow and rewire the supersource and supersink, plus the complexity of the chosen engine
+
+        """
+        if engine not in ResidualGraph.ENGINES:
+            raise ValueError("engine must be one of " + ", ".join(ResidualGraph.ENGINES))
+        if supplies is None:
+            supplies = [self.maxOut[origin] for origin in origins]
+        if len(supplies) != len(origins):
+            raise ValueError("supplies must have one entry per origin")
+
+        graph = self.graph
+        self.reset()
+        self.active_edges = [self.source_edges[origin] for origin in origins] + [self.target_edges[target] for target in targets]
+
+        for origin, supply in zip(origins, supplies):
+            graph.capacity[self.source_edges[origin]] += supply
+        for target in targets:
+            graph.capacity[self.target_edges[target]] = self.maxOut[target]
+
+        max_flow = getattr(graph, engine)(self.supersource, self.supersink)
+        contributions = {origin: graph.flow[self.source_edges[origin]] for origin in origins}
+        return max_flow, contributions
+
+    def reset(self):
+        """
+            Function used to clear the flow and unplug the origin and targets of the previous query
+        
+        """
+        for e in self.active_edges:
+            self.graph.capacity[e] = 0
+        self.active_edges = []
+        self.graph.flow[:] = array("q", bytes(8 * len(self.graph.flow)))
+
+    def query_many(self, queries, processes=None, engine="dinic", chunk_size=16):
+        """
+            Function description: 
+                Answers a list of (origin, targets) queries, spread across the worker processes of a process pool. The graph is put in shared memory
+                with share_residual_graph(), so every worker maps the same topology and only keeps its own capacity and flow arrays.
+
+            :Input:
+            argv1: The list of (origin, targets) queries
+            argv2: The number of worker processes, None for one per CPU, or 1 to answer every query in this process
+            argv3: The ResidualGraph engine to use
+            argv4: The number of queries handed to a worker at a time
+
+            :Output, return or postcondition: Returns the list of max flows, in the same order as queries
+
+        """
+        queries = list(queries)
+        if processes == 1:
+            return [self.query(origin, targets, engine) for origin, targets in queries]
+
+        # Workers start from the bare topology
+        self.reset()
+        shm, layout = share_residual_graph(self.graph)
+        state = (self.maxOut, self.source_edges, self.target_edges, self.supersource, self.supersink, engine)
+        try:
+            with Pool(processes, initializer=_init_index_worker, initargs=(shm.name, layout, state)) as pool:
+                return pool.map(_index_worker, queries, chunk_size)
+        finally:
+            shm.close()
+            shm.unlink()
+
+# Per process state of the query_many workers, set up once by _init_index_worker
+_index_state = {}
+
+def _init_index_worker(shm_name, layout, state):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    index = ThroughputIndex.__new__(ThroughputIndex)
+    index.graph = attach_residual_graph(shm.buf, layout)
+    index.maxOut, index.source_edges, index.target_edges, index.supersource, index.supersink, engine = state
+    index.active_edges = []
+    _index_state.update(shm=shm, index=index, engine=engine)
+
+def _index_worker(query):
+    origin, targets = query
+    return _index_state["index"].query(origin, targets, _index_state["engine"])
+
+def multiOriginThroughput(connections, maxIn, maxOut, origins, targets, supplies=None, engine="dinic"):
+    """
+            Function description: 
+                Multi-origin version of maxThroughput. All the origins are connected to one supersource, each with its own supply cap, and a single
+                max flow problem is solved, so the aggregate throughput never counts a channel twice.
+
+            :Input:
+            argv1: The list of connections
+            argv2: The list of maxIn for each respective data centres
+            argv3: The list of maxOut for each respective data centres
+            argv4: The list of origins
+            argv5: The list of targets
+            argv6: The supply cap of each origin, in the same order as origins. Defaults to maxOut of each origin.
+            argv7: The ResidualGraph engine to use
+
+            :Output, return or postcondition: Returns (max_flow, contributions), where max_flow is the aggregate throughput and contributions maps
+                                                each origin to its share of it. With a single origin, max_flow equals maxThroughput.
+
+            :Time complexity: O(C+D) to build the graph, plus the complexity of the chosen engine
+
+    """
+    return ThroughputIndex(connections, maxIn, maxOut).query_multi(origins, targets, supplies, engine)
+
+class ThroughputService:
+    """
+        Local asyncio service that answers maxThroughput queries over a TCP or Unix socket using JSON lines.
+
+        Every request is one JSON object on its own line, with "connections", "maxIn", "maxOut", "origin", "targets" and an optional "id". Every
+        response is one JSON object on its own line, with the same "id" and either "max_flow" or "error". Responses also carry "topology", the hash
+        of the topology, which later requests can send instead of "connections", "maxIn" and "maxOut" while that topology is still cached.
+        Requests on one connection are answered concurrently, so responses may come back out of order.
+
+        Results are kept in an LRU cache keyed by the topology hash and the query. Concurrent requests for the same topology are batched onto one
+        ThroughputIndex, which is also kept in an LRU cache, and every batch is solved in an executor so that the event loop never blocks.
+
+    """
+    def __init__(self, cache_size=4096, topology_cache_size=8, engine="dinic", executor=None):
+        if engine not in ResidualGraph.ENGINES:
+            raise ValueError("engine must be one of " + ", ".join(ResidualGraph.ENGINES))
+
+        self.cache_size = cache_size
+        self.topology_cache_size = topology_cache_size
+        self.engine = engine
+        self.executor = executor if executor is not None else ThreadPoolExecutor()
+        self.results = OrderedDict()
+        self.indexes = OrderedDict()
+        self.pending = {}
+        self.running = set()
+
+    @staticmethod
+    def topology_key(connections, maxIn, maxOut):
+        """
+            Function used to hash a topology, so that identical topologies sent by different clients share their cache entries
+        
+        """
+        encoded = json.dumps([connections, maxIn, maxOut], separators=(",", ":")).encode()
+        return hashlib.sha256(encoded).hexdigest()
+
+    @staticmethod
+    def _remember(cache, key, value, size):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+    async def solve(self, connections, maxIn, maxOut, origin, targets):
+        """
+            Function used to answer one query in process, with the same caching and batching as the socket requests. Returns the max flow.
+        
+        """
+        topology = (connections, maxIn, maxOut)
+        return await self.solve_key(self.topology_key(*topology), topology, origin, targets)
+
+    async def solve_key(self, key, topology, origin, targets):
+        """
+            Function description: 
+                Answers one query for the topology hashed as key. topology may be None if the topology is already cached. A query that is not in the
+                result cache joins the pending batch of its topology, which is solved by _run_batch() once the current loop iteration has let any other
+                concurrent requests join it.
+
+            :Output, return or postcondition: Returns the max flow. Raises a KeyError if topology is None and the topology is no longer cached, and a
+                                              ValueError if origin or one of the targets is not a data centre of the topology.
+
+        """
+        if topology is None and key not in self.indexes:
+            raise KeyError("unknown topology " + key)
+        data_centres = range(len(topology[1]) if topology is not None else len(self.indexes[key].maxOut))
+        if origin not in data_centres or any(target not in data_centres for target in targets):
+            raise ValueError("origin and targets must be data centres between 0 and " + str(len(data_centres) - 1))
+
+        result_key = (key, origin, tuple(targets))
+        if result_key in self.results:
+            self.results.move_to_end(result_key)
+            return self.results[result_key]
+
+        future = asyncio.get_running_loop().create_future()
+        batch = self.pending.setdefault(key, ([], []))
+        batch[0].append((origin, tuple(targets), future))
+        if topology is not None and not batch[1]:
+            batch[1].append(topology)
+
+        if key not in self.running:
+            self.running.add(key)
+            asyncio.get_running_loop().create_task(self._run_batch(key))
+
+        return await future
+
+    async def _run_batch(self, key):
+        loop = asyncio.get_running_loop()
+
+        # Let every request that is already waiting on the loop join this batch
+        await asyncio.sleep(0)
+        try:
+            while key in self.pending:
+                queries, topologies = self.pending.pop(key)
+                index = self.indexes.get(key)
+                try:
+                    if index is None and not topologies:
+                        raise KeyError("unknown topology " + key)
+                    index, results = await loop.run_in_executor(self.executor, self._answer, index, topologies[0] if topologies else None,
+                                                                [(origin, targets) for origin, targets, future in queries])
+                except Exception as error:
+                    for origin, targets, future in queries:
+                        if not future.done():
+                            future.set_exception(error)
+                    continue
+
+                self._remember(self.indexes, key, index, self.topology_cache_size)
+                for origin, targets, future in queries:
+                    max_flow = results[(origin, targets)]
+                    # A query that failed only fails its own requests, and is not cached
+                    if isinstance(max_flow, Exception):
+                        if not future.done():
+                            future.set_exception(max_flow)
+                        continue
+                    self._remember(self.results, (key, origin, targets), max_flow, self.cache_size)
+                    if not future.done():
+                        future.set_result(max_flow)
+        finally:
+            self.running.discard(key)
+
+    def _answer(self, index, topology, queries):
+        """
+            Runs in the executor. Builds the ThroughputIndex if it is not cached yet and answers every distinct query of the batch on it. A query
+            that raises has the exception as its result, so that the other queries of the batch are still answered.
+        
+        """
+        if index is None:
+            index = ThroughputIndex(*topology)
+        results = {}
+        for origin, targets in queries:
+            if (origin, targets) not in results:
+                try:
+                    results[(origin, targets)] = index.query(origin, targets, self.engine)
+                except Exception as error:
+                    results[(origin, targets)] = error
+        return index, results
+
+    async def handle_client(self, reader, writer):
+        """
+            Function used as the connection handler of the server. Every line read is answered by its own task, so the requests of one client can be
+            batched together as well.
+        
+        """
+        tasks = set()
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.get_running_loop().create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        writer.close()
+        await writer.wait_closed()
+
+    async def _respond(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            if "connections" in request:
+                topology = (request["connections"], request["maxIn"], request["maxOut"])
+                key = self.topology_key(*topology)
+            else:
+                topology = None
+                key = request["topology"]
+            max_flow = await self.solve_key(key, topology, request["origin"], request["targets"])
+            response = {"id": request_id, "topology": key, "max_flow": max_flow}
+        except Exception as error:
+            response = {"id": request_id, "error": type(error).__name__ + ": " + str(error)}
+
+        writer.write((json.dumps(response) + "\n").encode())
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=0, path=None):
+        """
+            Function used to start listening, on a Unix socket if path is given and on TCP otherwise. Returns the asyncio server.
+        
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle_client, path=path)
+        return await asyncio.start_server(self.handle_client, host, port)
+
+def serveThroughput(host="127.0.0.1", port=8765, path=None, **kwargs):
+    """
+        Function used to run a ThroughputService until it is interrupted. Any keyword arguments are passed on to ThroughputService.
+    
+    """
+    async def main():
+        server = await ThroughputService(**kwargs).start(host, port, path)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+def share_residual_graph(graph):
+    """
+        Function used to copy the arrays of a ResidualGraph into one block of shared memory. Returns the SharedMemory block together with its layout,
+        a tuple of (typecode, offset, length) for head, next, to, capacity and flow, which attach_residual_graph() needs to map it again.
+        The caller is responsible for closing and unlinking the block.
+
+    """
+    arrays = (graph.head, graph.next, graph.to, graph.capacity, graph.flow)
+    layout, size = aligned_layout([(values.typecode, len(values)) for values in arrays])
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for values, (typecode, offset, length) in zip(arrays, layout):
+        shm.buf[offset:offset + values.itemsize * length] = values.tobytes()
+
+    return shm, layout
+
+def aligned_layout(shapes, offset=0):
+    """
+        Function used to lay arrays, e.g. those of a ResidualGraph or a flattened CatsTrie, out one after another from offset, each one 8 byte
+        aligned so that it can be cast back in place. Takes a (typecode, length) pair per array and returns the layout, a tuple of
+        (typecode, offset, length) per array, together with the end offset.
+
+    """
+    layout = []
+    for typecode, length in shapes:
+        offset = (offset + 7) // 8 * 8
+        layout.append((typecode, offset, length))
+        offset += array(typecode).itemsize * length
+    return tuple(layout), offset
+
+def attach_residual_graph(buffer, layout, private=("capacity", "flow")):
+    """
+        Function used to map a ResidualGraph laid out with aligned_layout() in buffer, e.g. the buf of a block made by share_residual_graph().
+        The topology arrays are read straight from the buffer, while the arrays named in private are copied so that this process can change them
+        without affecting the others. If the layout has no flow array, the graph starts with a private flow of 0 on every edge.
+
+    """
+    names = ("head", "next", "to", "capacity", "flow")
+    arrays = []
+    for name, (typecode, offset, length) in zip(names, layout):
+        view = buffer[offset:offset + array(typecode).itemsize * length].cast(typecode)
+        arrays.append(array(typecode, view) if name in private else view)
+    if len(arrays) == 4:
+        arrays.append(array("q", bytes(8 * len(arrays[2]))))
+    return ResidualGraph.from_arrays(*arrays)
+
+# Magic, version, byte order mark, vertex count, edge slots, supersource and supersink
+THROUGHPUT_GRAPH_MAGIC = b"FLOWGRPH"
+THROUGHPUT_GRAPH_VERSION = 1
+_THROUGHPUT_GRAPH_HEADER = struct.Struct("=8sIIqqqq")
+# Typecodes of the head, next, to and capacity arrays
+_THROUGHPUT_GRAPH_TYPECODES = ("i", "i", "i", "q")
+
+def save_throughput_graph(path, graph, supersource, supersink):
+    """
+        Function description: 
+            Saves a built ResidualGraph, e.g. from build_throughput_graph(..., graph_class=ResidualGraph), to a flat binary file. The file is a small
+            header followed by the raw head, next, to and capacity arrays, each 8 byte aligned. The flow is not saved, since it belongs to a solve
+            rather than to the topology.
+
+        :Input:
+        argv1: The path of the file to write
+        argv2: The ResidualGraph
+        argv3: The supersource
+        argv4: The supersink
+
+        :Time complexity: O(C+D), where D is the number of data centres, and C is the number of communication channels
+
+    """
+    arrays = (graph.head, graph.next, graph.to, graph.capacity)
+    # Always the typecodes load_throughput_graph() expects, since the arrays may be memoryviews of a loaded graph, which have no typecode
+    layout, size = aligned_layout(zip(_THROUGHPUT_GRAPH_TYPECODES, map(len, arrays)), _THROUGHPUT_GRAPH_HEADER.size)
+
+    with open(path, "wb") as file:
+        file.write(_THROUGHPUT_GRAPH_HEADER.pack(THROUGHPUT_GRAPH_MAGIC, THROUGHPUT_GRAPH_VERSION, 0x01020304,
+                                                 len(graph.head), len(graph.to), supersource, supersink))
+        for values, (typecode, offset, length) in zip(arrays, layout):
+            file.write(bytes(offset - file.tell()))
+            file.write(array(typecode, values).tobytes())
+
+def load_throughput_graph(path):
+    """
+        Function description: 
+            Loads a graph saved by save_throughput_graph() by memory mapping the file read-only, without parsing or copying the topology. Every process
+            that loads the same file shares one copy of it through the page cache, and only the flow array, which starts at 0, is private.
+
+        :Input:
+        argv1: The path of the file to load
+
+        :Output, return or postcondition: Returns (graph, supersource, supersink), ready for any ResidualGraph engine. The topology of the graph is
+                                            read-only, so it cannot be changed with add_edge() or update_capacity().
+
+        :Time complexity: O(E) to allocate the private flow array, where E is the number of edges; the topology itself is paged in lazily
+
+    """
+    with open(path, "rb") as file:
+        mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    buffer = memoryview(mapping)
+    magic, version, byte_order, vertex_count, edge_slots, supersource, supersink = _THROUGHPUT_GRAPH_HEADER.unpack_from(buffer)
+    if magic != THROUGHPUT_GRAPH_MAGIC or version != THROUGHPUT_GRAPH_VERSION:
+        raise ValueError(path + " is not a version " + str(THROUGHPUT_GRAPH_VERSION) + " throughput graph")
+    if byte_order != 0x01020304:
+        raise ValueError(path + " was saved on a machine with a different byte order than " + sys.byteorder)
+
+    layout, size = aligned_layout(zip(_THROUGHPUT_GRAPH_TYPECODES, (vertex_count, edge_slots, edge_slots, edge_slots)), _THROUGHPUT_GRAPH_HEADER.size)
+    if len(mapping) < size:
+        raise ValueError(path + " is truncated")
+
+    graph = attach_residual_graph(buffer, layout, private=())
+    return graph, supersource, supersink
+
+# Per process state of the contingency workers, set up once by _init_contingency_worker
+_contingency_state = {}
+
+def _init_contingency_worker(shm_name, layout, supersource, supersink, base_flow, connection_edges):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    graph = attach_residual_graph(shm.buf, layout)
+    _contingency_state.update(
+        shm=shm,
+        graph=graph,
+        base_capacity=array(graph.capacity.typecode, graph.capacity),
+        base_flow=array(graph.flow.typecode, graph.flow),
+        supersource=supersource,
+        supersink=supersink,
+        max_flow=base_flow,
+        connection_edges=connection_edges,
+    )
+
+def _contingency_worker(indices):
+    """
+        Evaluates one slice of failure scenarios. Every scenario starts from the base max flow, removes one channel with update_capacity() and records
+        the repaired max flow.
+
+    """
+    state = _contingency_state
+    graph = state["graph"]
+    results = []
+    for i in indices:
+        graph.capacity[:] = state["base_capacity"]
+        graph.flow[:] = state["base_flow"]
+        delta = graph.update_capacity(state["connection_edges"][i], 0, state["supersource"], state["supersink"])
+        results.append((i, state["max_flow"] + delta))
+    return results
+
+def contingencyThroughput(connections, maxIn, maxOut, origin, targets, processes=None, chunk_size=64):
+    """
+            Function description: 
+                N-1 contingency analysis for maxThroughput. For every channel in connections, it finds the max throughput of the network with only that
+                channel removed. The node split graph and its max flow are computed once with a ThroughputSession and put in shared memory. The workers
+                of a process pool then map that block and evaluate slices of the failure scenarios, each one starting from the base max flow as a
+                warm start rather than solving from scratch.
+
+            :Input:
+            argv1: The list of connections
+            argv2: The list of maxIn for each respective data centres
+            argv3: The list of maxOut for each respective data centres
+            argv4: The source vertex
+            argv5: The list of targets
+            argv6: The number of worker processes, None for one per CPU, or 1 to run everything in this process
+            argv7: The number of scenarios handed to a worker at a time
+
+            :Output, return or postcondition: A generator that yields (i, max_flow) as soon as each slice finishes, where max_flow is the max throughput
+                                                with connections[i] removed. Results are not in index order.
+
+            :Time complexity: O(C*R), where C is the number of communication channels and R is the cost of one ResidualGraph.update_capacity() repair,
+                                split across the worker processes.
+
+            :Aux space complexity: O(C+D) shared, plus a private copy of the capacity and flow arrays in every worker.
+
+    """
+    session = ThroughputSession(connections, maxIn, maxOut, origin, targets)
+    initargs = (session.supersource, session.supersink, session.max_flow, array("i", session.connection_edges))
+    slices = [range(i, min(i + chunk_size, len(connections))) for i in range(0, len(connections), chunk_size)]
+
+    shm, layout = share_residual_graph(session.graph)
+    try:
+        if processes == 1:
+            _init_contingency_worker(shm.name, layout, *initargs)
+            try:
+                for indices in slices:
+                    yield from _contingency_worker(indices)
+            finally:
+                # The shared block can only be closed once the views into it have been dropped
+                shm_view = _contingency_state.pop("shm")
+                _contingency_state.clear()
+                shm_view.close()
+        else:
+            with Pool(processes, initializer=_init_contingency_worker, initargs=(shm.name, layout) + initargs) as pool:
+                for results in pool.imap_unordered(_contingency_worker, slices):
+                    yield from results
+    finally:
+        shm.close()
+        shm.unlink()
+
+TOPOLOGY_KINDS = ("layered", "sparse", "mesh", "chain")
+
+def generate_topology(kind, channel_count, seed=0):
+    """
+        Function description: 
+            Generates a reproducible data centre topology with exactly channel_count channels, for benchmarking the flow solvers. The same kind,
+            channel_count and seed always give the same topology.
+
+                layered: data centres in layers, with channels only between consecutive layers, origin in the first layer and targets in the last
+                sparse: about 4 channels per data centre between random pairs
+                mesh: a random subset of all ordered pairs of the fewest data centres that can hold channel_count channels, so D*(D-1) channels give
+                      the complete mesh of D data centres
+                chain: a long path from the origin to the single target, with the remaining channels as short forward skips
+
+            The origin and targets get maxIn/maxOut large enough that the max flow is decided by the rest of the topology.
+
+        :Input:
+        argv1: One of TOPOLOGY_KINDS
+        argv2: The number of channels
+        argv3: The seed
+
+        :Output, return or postcondition: Returns (connections, maxIn, maxOut, origin, targets) in the same format taken by maxThroughput
+
+        :Time complexity: O(C+D), where D is the number of data centres, and C is the number of communication channels
+
+    """
+    if kind not in TOPOLOGY_KINDS:
+        raise ValueError("kind must be one of " + ", ".join(TOPOLOGY_KINDS))
+    rng = random.Random(str(seed) + kind + str(channel_count))
+
+    if kind == "layered":
+        data_center_count = max(4, channel_count // 8)
+        layers = max(2, int(data_center_count ** 0.5))
+        width = data_center_count // layers
+        data_center_count = layers * width
+        connections = []
+        for _ in range(channel_count):
+            layer = rng.randrange(layers - 1)
+            connections.append((layer * width + rng.randrange(width), (layer + 1) * width + rng.randrange(width), rng.randint(1, 100)))
+        origin = 0
+        targets = list(range((layers - 1) * width, data_center_count))
+    elif kind == "sparse":
+        data_center_count = max(4, channel_count // 4)
+        connections = []
+        while len(connections) < channel_count:
+            u = rng.randrange(data_center_count)
+            v = rng.randrange(data_center_count)
+            if u != v:
+                connections.append((u, v, rng.randint(1, 100)))
+        origin = 0
+        targets = rng.sample(range(1, data_center_count), max(1, data_center_count // 10))
+    elif kind == "mesh":
+        data_center_count = 2
+        while data_center_count * (data_center_count - 1) < channel_count:
+            data_center_count += 1
+        connections = []
+        for pair in rng.sample(range(data_center_count * (data_center_count - 1)), channel_count):
+            u, v = divmod(pair, data_center_count - 1)
+            connections.append((u, v + 1 if v >= u else v, rng.randint(1, 100)))
+        origin = 0
+        targets = list(range(data_center_count - max(1, data_center_count // 4), data_center_count))
+    else:
+        data_center_count = max(2, channel_count // 2 + 1)
+        connections = [(i, i + 1, rng.randint(1, 100)) for i in range(data_center_count - 1)]
+        while len(connections) < channel_count:
+            u = rng.randrange(data_center_count - 1)
+            connections.append((u, min(data_center_count - 1, u + rng.randint(2, 8)), rng.randint(1, 100)))
+        origin = 0
+        targets = [data_center_count - 1]
+
+    maxIn = [rng.randint(50, 1000) for _ in range(data_center_count)]
+    maxOut = [rng.randint(50, 1000) for _ in range(data_center_count)]
+    for i in [origin] + targets:
+        maxIn[i] = maxOut[i] = 100 * channel_count
+    return connections, maxIn, maxOut, origin, targets
+
+def flow_solvers():
+    """
+        Function used to list every available solver as a (backend, engine) pair
+    
+    """
+    return [(backend, engine) for backend, graph_class in FLOW_BACKENDS.items() for engine in graph_class.ENGINES]
+
+BENCHMARK_FIELDS = ("kind", "channels", "data_centres", "backend", "engine", "vertices", "edges", "max_flow", "build_seconds", "solve_seconds",
+                    "peak_bytes")
+
+def benchmarkFlowSolvers(path, kinds=TOPOLOGY_KINDS, sizes=(100, 1000, 10000), solvers=None, seed=0):
+    """
+            Function description: 
+                Benchmark suite for the flow solvers. For every kind and size, it generates a topology with generate_topology() and runs every solver on
+                it, timing the graph construction and the solve separately. Each solver is then run a second time under tracemalloc to record its peak
+                memory, since tracing slows down the timed run. One CSV row is written per run, in a fixed order so the files can be diffed between
+                releases.
+
+                Sizes up to 10^6 channels are supported, but the object based "graph" backend and the augmenting path engines get slow well before
+                that, so pass a smaller list of solvers for the large sizes.
+
+                vertices and edges are the size of the graph each backend stores (edges not counting reverse edges), which together with peak_bytes
+                compares the memory of the backends, e.g. "vertex" against "array". For a dense comparison of push_relabel against the augmenting
+                path engines, use kinds=("mesh",) with D*(D-1) channels, e.g. 9900 for the complete mesh of 100 data centres.
+
+            :Input:
+            argv1: The path of the CSV file to write
+            argv2: The kinds of topology, see TOPOLOGY_KINDS
+            argv3: The numbers of channels
+            argv4: The list of (backend, engine) pairs to run, defaults to flow_solvers()
+            argv5: The seed passed to generate_topology()
+
+            :Output, return or postcondition: Writes the CSV with the columns in BENCHMARK_FIELDS and returns its rows. Raises a ValueError if two
+                                                solvers disagree on the max flow of a topology.
+
+    """
+    if solvers is None:
+        solvers = flow_solvers()
+
+    rows = []
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(BENCHMARK_FIELDS)
+
+        for kind in kinds:
+            for size in sizes:
+                connections, maxIn, maxOut, origin, targets = generate_topology(kind, size, seed)
+                max_flows = set()
+
+                for backend, engine in solvers:
+                    graph_class = FLOW_BACKENDS[backend]
+
+                    start = time.perf_counter()
+                    graph, supersource, supersink = build_throughput_graph(connections, maxIn, maxOut, origin, targets, graph_class)
+                    build_seconds = time.perf_counter() - start
+                    start = time.perf_counter()
+                    max_flow = getattr(graph, engine)(supersource, supersink)
+                    solve_seconds = time.perf_counter() - start
+                    if backend == "graph":
+                        vertices = len(graph.vertices)
+                        edges = sum(len(vertex.edges) for vertex in graph.vertices) // 2
+                    else:
+                        vertices = graph.vertex_count
+                        edges = len(graph.to) // 2
+                    del graph
+
+                    tracemalloc.start()
+                    graph, supersource, supersink = build_throughput_graph(connections, maxIn, maxOut, origin, targets, graph_class)
+                    getattr(graph, engine)(supersource, supersink)
+                    peak_bytes = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    del graph
+
+                    max_flows.add(max_flow)
+                    row = (kind, size, len(maxIn), backend, engine, vertices, edges, max_flow, round(build_seconds, 6), round(solve_seconds, 6),
+                           peak_bytes)
+                    writer.writerow(row)
+                    rows.append(row)
+
+                if len(max_flows) > 1:
+                    raise ValueError("solvers returned different max flows on the " + kind + " topology with " + str(size) + " channels")
+
+    return rows
+
+"""
+
+    #########################################################################################################
+    #                                                                                                       #
+    #                                                catGPT                                                 #
+    #                                            Final Version                                              #
+    #                                                                                                       #
+    #########################################################################################################
+    
+"""
+class ChildMap(dict):
+    """
+    Sparse link "list" used by the nodes of a byte mode CatsTrie
+     - A dict keyed by the char itself that returns None for a missing child instead of raising, so it reads like the 27 slot link lists
+
+    """
+    __slots__ = ()
+
+    def __missing__(self, key):
+        return None
+
+class Node:
+    """
+    Node Class for Q2
+     - Each node will depict a char
+
+    """
+    def __init__(self, char=None, size=27):
+        """
+        Init for the Node class
+         - Initializes the variables for each node
+         - Note: max_frequency is the max frequency of the leaf node that will be saved in each node
+         - Note: sentence and top are only used when the CatsTrie keeps top-k lists. sentence is the full sentence of a leaf node, and top is the list
+                 of the top-k leaf nodes below this node, most frequent first
+         - Note: a size of 0 gives a ChildMap instead of a link list, so only the children that exist take up space
+
+        """
+        self.char = char
+        self.link = [None] * size if size else ChildMap()
+        self.frequency = 0
+        self.last = False
+        self.max_frequency = 0
+        self.sentence = None
+        self.top = None
+
+class CatsTrie:
+    """
+    Trie Class for Q2
+     - A trie class that encapsulates all of the cat sentences.
+
+    """
+    def __init__(self, sentences, top_k=0, byte_mode=False, snapshot=False):
+        """
+            Function description: 
+                Initializes the CatsTrie by inserting and linking the nodes. During this process, it will update the nodes with their frequencies
+                and also note down whether it is the leaf node or not. It does so by first create the root node before building the rest of the
+                Trie using the build() function.
+
+                By default the sentences may only use the lowercase letters a-z. In byte mode any text is accepted: every sentence is stored as its
+                UTF-8 bytes, one node per byte, and the children of a node are kept in a ChildMap keyed by byte, so the memory of a node is
+                proportional to the children it actually has rather than to the size of the alphabet. Queries take the same time in both modes.
+
+                In snapshot mode the nodes reachable from a published root are never changed. Updates copy the nodes on the path they change, under
+                a lock, and then publish the new root with a single assignment, so readers in other threads always see a whole version of the Trie
+                without taking any lock. snapshot may also be switched on after a bulk build, e.g. by from_sentences().
+
+            :Input:
+            argv1: The list of sentences
+            argv2: The number of completions to keep at every node for autoComplete_topk(), 0 to disable it
+            argv3: Whether to store UTF-8 bytes in sparse child maps instead of a-z in 27 slot link lists
+            argv4: Whether updates copy the nodes they change instead of changing them in place
+
+            :Preconditions:
+                1. The list of sentences must contain at least one sentence.
+
+            :Output, return or postcondition: Builds a Trie that contains all the sentences, characters, and their frequencies.
+
+            :Time complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+
+                During the initialization process, we will be inserting/updating the Trie at least N*M times. To be more accurate, we will be updating
+                the Trie N*T times, where T is the number of characters in each sentence.
+
+            :Aux space complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+
+                Similarly, we will also need approximately N*M amount of space to store all the information of the Trie. 
+
+        """
+        self.top_k = top_k
+        self.byte_mode = byte_mode
+        self.infix = None
+        self.lock = threading.RLock()
+        self.snapshot = False
+        self.root = self.new_node(None)
+        if top_k:
+            self.root.top = []
+        self.build(sentences)
+        self.snapshot = snapshot
+
+    def build(self, sentences):
+        """
+            Function description: 
+                For each sentence in sentences, it will insert them one by one into the Trie. Everything else, is explained in the documentation
+                for __init__.
+
+            :Input:
+            argv1: The list of sentences
+
+            :Preconditions:
+                1. The list of sentences must contain at least one sentence.
+
+            :Time complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+
+                Calls insert for each sentence in sentences.
+
+        """
+        for sentence in sentences:
+            self.insert(sentence)
+
+    def encode(self, text):
+        """
+            Maps a sentence or prompt to the chars that are stored in the Trie. In byte mode these are its UTF-8 bytes, held one per char of a latin-1
+            string so they can be sliced and compared like any other string. UTF-8 keeps the order of the code points, so sorting either gives the
+            same order.
+
+        """
+        return text.encode("utf-8").decode("latin-1") if self.byte_mode else text
+
+    def decode(self, key):
+        """
+            Inverse of encode()
+
+        """
+        if key is None or not self.byte_mode:
+            return key
+        return key.encode("latin-1").decode("utf-8")
+
+    def new_node(self, char):
+        """
+            Creates a node with a link list or, in byte mode, a sparse ChildMap
+
+        """
+        return Node(char, 0 if self.byte_mode else 27)
+
+    def copy_node(self, node):
+        """
+            Function used in snapshot mode to copy a node before changing it. The link list and top-k list are copied too, but the children are
+            shared with the original.
+
+        """
+        copy = Node.__new__(Node)
+        copy.__dict__.update(node.__dict__)
+        copy.link = list(node.link) if not self.byte_mode else ChildMap(node.link)
+        if node.top is not None:
+            copy.top = list(node.top)
+        return copy
+
+    def slot(self, char):
+        """
+            Index of the child for char in a node's link: the char itself in byte mode, its position in the alphabet otherwise
+
+        """
+        return char if self.byte_mode else ord(char) - 97 + 1
+
+    def children(self, node):
+        """
+            Returns the (char, child) pairs of node, skipping empty slots
+
+        """
+        if self.byte_mode:
+            return node.link.items()
+        return [(chr(index + 97 - 1), child) for index, child in enumerate(node.link) if child is not None]
+
+    def unlink(self, node, char):
+        """
+            Removes the child for char from node
+
+        """
+        if self.byte_mode:
+            node.link.pop(char, None)
+        else:
+            node.link[ord(char) - 97 + 1] = None
+
+    @classmethod
+    def from_sentences(cls, sentences, presorted=False, top_k=0, byte_mode=False):
+        """
+            Function description: 
+                Bulk constructor that builds the same Trie as CatsTrie(sentences) without any recursion. The sentences are sorted (unless they are
+                already), duplicates are counted, and the Trie is then built in one left-to-right pass by build_sorted().
+
+            :Input:
+            argv1: The list of sentences
+            argv2: Whether the sentences are already sorted
+            argv3: The number of completions to keep at every node for autoComplete_topk(), 0 to disable it
+            argv4: Whether to build a byte mode Trie, see __init__
+
+            :Output, return or postcondition: Returns the new CatsTrie
+
+            :Time complexity: O(NM log N) to sort, or O(NM) if presorted, where N is the number of sentence in sentences and M is the number of
+                                characters in the longest sentence.
+
+        """
+        trie = cls([], top_k, byte_mode)
+        if not presorted:
+            sentences = sorted(sentences)
+
+        # Count runs of equal sentences, which are next to each other once sorted
+        counts = []
+        for sentence in sentences:
+            if counts and counts[-1][0] == sentence:
+                counts[-1][1] += 1
+            else:
+                counts.append([sentence, 1])
+
+        trie.build_sorted(counts)
+        return trie
+
+    @classmethod
+    def from_stream(cls, source, max_distinct=1000000, top_k=0, byte_mode=False):
+        """
+            Function description: 
+                Builds the same Trie as from_sentences() from a stream of sentences, without ever holding the whole corpus in memory. Duplicates are
+                counted in a dict of at most max_distinct sentences. Whenever it fills up, its counts are sorted and spilled to a temporary file as a
+                run of JSON lines, and the dict starts over. At the end the runs are merged with heapq.merge, the counts of a sentence found in several
+                runs are added up, and build_sorted() inserts every distinct sentence once with its count. Peak memory is the Trie plus the dict.
+
+            :Input:
+            argv1: An iterable of sentences, or the path of a UTF-8 text file with one sentence per line. Empty lines of the file are skipped, but
+                   an iterable may still contain the empty sentence.
+            argv2: The most distinct sentences to count in memory before spilling to disk
+            argv3: The number of completions to keep at every node for autoComplete_topk(), 0 to disable it
+            argv4: Whether to build a byte mode Trie, see __init__
+
+            :Output, return or postcondition: Returns the new CatsTrie
+
+            :Time complexity: O(NM log D), where N is the number of sentences, M is the number of characters in the longest sentence and D is the
+                                number of distinct sentences.
+
+        """
+        trie = cls([], top_k, byte_mode)
+        if isinstance(source, str):
+            with open(source, encoding="utf-8") as file:
+                sentences = (line.rstrip("\r\n") for line in file)
+                runs, counts = cls.count_sentences((sentence for sentence in sentences if sentence), max_distinct)
+        else:
+            runs, counts = cls.count_sentences(source, max_distinct)
+
+        try:
+            if not runs:
+                trie.build_sorted(sorted(counts.items()))
+                return trie
+
+            runs.append(cls.spill_run(counts))
+            del counts
+            for run in runs:
+                run.seek(0)
+            merged = heapq.merge(*[map(json.loads, run) for run in runs])
+            trie.build_sorted(cls.add_up_runs(merged))
+            return trie
+        finally:
+            for run in runs:
+                run.close()
+
+    @classmethod
+    def count_sentences(cls, sentences, max_distinct):
+        """
+            Function used by from_stream() to count the sentences in a bounded dict. Returns the list of spilled runs and the counts not spilled yet.
+
+        """
+        runs = []
+        counts = {}
+        try:
+            for sentence in sentences:
+                if sentence in counts:
+                    counts[sentence] += 1
+                else:
+                    if len(counts) >= max_distinct:
+                        runs.append(cls.spill_run(counts))
+                        counts = {}
+                    counts[sentence] = 1
+        except BaseException:
+            for run in runs:
+                run.close()
+            raise
+        return runs, counts
+
+    @staticmethod
+    def spill_run(counts):
+        """
+            Function used by from_stream() to write counts, sorted by sentence, to a temporary file that is deleted once closed
+
+        """
+        run = tempfile.TemporaryFile("w+", encoding="utf-8")
+        for sentence, count in sorted(counts.items()):
+            run.write(json.dumps([sentence, count]) + "\n")
+        return run
+
+    @staticmethod
+    def add_up_runs(merged):
+        """
+            Function used by from_stream() to add up the counts of equal sentences, which are next to each other in the merged runs
+
+        """
+        previous = None
+        total = 0
+        for sentence, count in merged:
+            if sentence != previous and previous is not None:
+                yield previous, total
+                total = 0
+            previous = sentence
+            total += count
+        if previous is not None:
+            yield previous, total
+
+    def build_sorted(self, counts):
+        """
+            Function description: 
+                Builds the Trie from (sentence, count) pairs sorted by sentence with no repeated sentences, in a single left-to-right pass. A stack holds
+                the path to the previous sentence. For each sentence, the part of that path below its common prefix with the previous sentence is
+                finished, i.e. popped with every node handing its max_frequency up to its parent, and the rest of the sentence is then pushed as new
+                nodes. Since the sentences are sorted, no node is ever revisited once it has been popped, so max_frequency is computed bottom-up.
+                The top-k lists are merged bottom-up in the same way.
+
+            :Input:
+            argv1: The (sentence, count) pairs, sorted by sentence
+
+            :Preconditions:
+                1. The pairs must be sorted by sentence and every sentence must appear at most once
+                2. The Trie must not already contain any of the sentences
+
+            :Time complexity: O(NM), where N is the number of pairs and M is the number of characters in the longest sentence.
+
+            :Aux space complexity: O(M), for the stack.
+
+        """
+        stack = [self.root]
+        previous = None
+
+        for key, count in counts:
+            key = self.encode(key)
+            if previous is not None and key <= previous:
+                key = self.decode(key)
+                previous = self.decode(previous)
+                raise ValueError("sentences must be sorted and counted: " + repr(key) + " after " + repr(previous))
+
+            # Length of the common prefix with the previous sentence
+            common = 0
+            if previous is not None:
+                while common < len(key) and common < len(previous) and key[common] == previous[common]:
+                    common += 1
+
+            # Finish the nodes that are not shared with this sentence
+            while len(stack) > common + 1:
+                self.finish_node(stack.pop(), stack[-1])
+
+            # Push the rest of the sentence as new nodes
+            for char in key[common:]:
+                child = self.new_node(char)
+                if self.top_k:
+                    child.top = []
+                stack[-1].link[self.slot(char)] = child
+                stack.append(child)
+
+            current = stack[-1]
+            current.frequency += count
+            current.last = True
+            current.max_frequency = max(current.max_frequency, current.frequency)
+            if self.top_k:
+                current.sentence = key
+                current.top = [current]
+            previous = key
+
+        while len(stack) > 1:
+            self.finish_node(stack.pop(), stack[-1])
+
+    def finish_node(self, child, parent):
+        """
+            Function used by build_sorted() to hand the max_frequency and top-k list of a finished child up to its parent
+        
+        """
+        parent.max_frequency = max(parent.max_frequency, child.max_frequency)
+        if self.top_k:
+            parent.top = sorted(parent.top + child.top, key=self.top_order)[:self.top_k]
+
+    @staticmethod
+    def top_order(node):
+        """
+            Sort key of the top-k lists: most frequent first, and alphabetically on ties, which matches the tie breaking of autoComplete()
+        
+        """
+        return -node.frequency, node.sentence
+
+    def insert(self, key):
+        """
+            Function description: 
+                Recursively calls itself to insert each characters of a sentence. In snapshot mode it is add_count(key, 1) instead.
+
+        """
+        if self.snapshot:
+            self.add_count(key, 1)
+            return
+        key = self.encode(key)
+        with self.lock:
+            self.insert_recursive(key, self.root, 0)
+            if self.top_k:
+                self.update_top(key)
+
+    def update_top(self, key):
+        """
+            Function description: 
+                Updates the top-k list of every node on the path of key after key has been inserted. The frequency of key has just gone up, so it is
+                the only leaf that can enter a list or move up within one.
+
+            :Input:
+            argv1: The key that was just inserted, as returned by encode()
+
+            :Time complexity: O(M*K log K), where M is the length of the sentence and K is top_k.
+
+        """
+        path = [self.root]
+        for char in key:
+            path.append(path[-1].link[self.slot(char)])
+
+        terminal = path[-1]
+        terminal.sentence = key
+        for node in path:
+            if node.top is None:
+                node.top = []
+            if not any(entry is terminal for entry in node.top):
+                node.top.append(terminal)
+            node.top.sort(key=self.top_order)
+            del node.top[self.top_k:]
+
+    def add_count(self, key, delta):
+        """
+            Function description: 
+                Changes the frequency of key by delta, which may be negative. A key whose frequency drops to 0 is no longer a sentence of the Trie.
+                The max_frequency (and top-k list) of every node on the path of key is then recomputed bottom-up from its own frequency and its
+                children, and nodes that no longer lead to any sentence are unlinked so their memory can be reclaimed. Updates are serialized by a
+                lock. In snapshot mode the path is copied first and the copy of the root is published once it has been repaired.
+
+            :Input:
+            argv1: The key whose frequency changes
+            argv2: The change in frequency
+
+            :Output, return or postcondition: Returns the new frequency of key
+
+            :Raises KeyError: When delta is negative and key is not in the Trie
+            :Raises ValueError: When the frequency of key would drop below 0
+
+            :Time complexity: O(M*A), where M is the length of the sentence and A is the size of the alphabet (27), or O(M*A*K log K) with top-k lists.
+
+        """
+        with self.lock:
+            sentence = key
+            key = self.encode(key)
+            path = [self.copy_node(self.root) if self.snapshot else self.root]
+            for char in key:
+                index = self.slot(char)
+                child = path[-1].link[index]
+                if child is None:
+                    if delta < 0:
+                        raise KeyError(sentence)
+                    child = self.new_node(char)
+                    path[-1].link[index] = child
+                elif self.snapshot:
+                    child = self.copy_node(child)
+                    path[-1].link[index] = child
+                path.append(child)
+
+            current = path[-1]
+            if delta < 0 and not current.last:
+                raise KeyError(sentence)
+            if current.frequency + delta < 0:
+                raise ValueError("the frequency of " + repr(sentence) + " would drop below 0")
+
+            current.frequency += delta
+            current.last = current.frequency > 0
+            if self.top_k:
+                current.sentence = key
+            self.repair_path(path, key)
+            if self.snapshot:
+                # Publish the new version in one step; readers holding the old root keep a consistent Trie
+                self.root = path[0]
+
+            return current.frequency
+
+    def remove(self, key):
+        """
+            Function used to remove every occurrence of key from the Trie. See add_count().
+
+            :Raises KeyError: When key is not in the Trie
+        
+        """
+        with self.lock:
+            current = self.root
+            for char in self.encode(key):
+                current = current.link[self.slot(char)]
+                if current is None:
+                    raise KeyError(key)
+            if not current.last:
+                raise KeyError(key)
+
+            self.add_count(key, -current.frequency)
+
+    def repair_path(self, path, key):
+        """
+            Function description: 
+                Recomputes max_frequency, and the top-k list if enabled, for every node of path from the bottom up, and unlinks the nodes that no longer
+                lead to any sentence. path[i] must be the node reached after the first i chars of key, as returned by encode().
+
+            :Time complexity: O(M*A), where M is the length of the path and A is the size of the alphabet (27), or O(M*A*K log K) with top-k lists.
+
+        """
+        for depth in range(len(path) - 1, -1, -1):
+            node = path[depth]
+            children = [child for char, child in self.children(node)]
+
+            node.max_frequency = node.frequency if node.last else 0
+            for child in children:
+                node.max_frequency = max(node.max_frequency, child.max_frequency)
+
+            if self.top_k:
+                entries = [node] if node.last else []
+                for child in children:
+                    entries.extend(child.top)
+                entries.sort(key=self.top_order)
+                node.top = entries[:self.top_k]
+
+            # Prune a node that has no sentences left below it
+            if depth > 0 and node.max_frequency == 0:
+                self.unlink(path[depth - 1], key[depth - 1])
+
+    def insert_recursive(self, key, current, key_pos):
+        """
+            Function description: 
+                Recursive function used by insert to create the nodes and update them until it reaches the base case (leaf node) and sets last as true
+                for that particular node. It will also update the max_frequency on the way up the recursion with the frequency of the leaf node with
+                the highest frequency. This will be used later on to traverse down the trie to obtain the most frequency word that can autocomplete
+                the prompt given to us.
+
+            :Input:
+            argv1: The key that needs to be inserted into the trie data structure
+            argv2: The current node of the trie where the insertion is being performed
+            argv3: The integer keeping track of the current position of the key 
+
+            :Time complexity: O(M), M is the length of the sentence.
+                Inserts or updates the nodes depending of which character it reads M times.
+
+        """
+        if key_pos == len(key):
+            current.frequency += 1
+            current.last = True
+            current.max_frequency = max(current.max_frequency, current.frequency)
+            return
+
+        char = key[key_pos]
+        index = self.slot(char)
+
+        if current.link[index] is None:
+            current.link[index] = self.new_node(char)
+
+        child = current.link[index]
+        self.insert_recursive(key, child, key_pos + 1)
+        current.max_frequency = max(current.max_frequency, child.max_frequency)
+        
+    def findHighestFrequencyWord(self, current, prefix, highest_freq, highest_word):
+        """
+            Function description: 
+                Finds the highest frequency word for the autoComplete method. This function checks through every child starting from the children of the prefix
+                node for the max_frequency. If the max frequency of the child is greater than the current max frequency, we will traverse down the direction of
+                that child node. By referring to this max_frequency variable, we can effectively traverse down the path that will lead us to the most frequent
+                sentence in sentences that can autocomplete the given prompt.
+
+            :Input:
+            argv1: The current node
+            argv2: The entire prefix
+            argv3: The highest frequency so far
+            argv4: The word with the highest frequency so far
+
+            :Preconditions:
+                1. There needs to be at least one node.
+                2. There needs to be some prefix.
+                3. It needs to be given the highest recorded frequency so far.
+                4. It needs to be given the word with the highest frequency so far.
+
+            :Output, return or postcondition: Returns either the prefix or the prefix + the rest of the characters that makes up the most frequent sentence
+                                                in sentences.
+
+            :Time complexity: O(Y), where Y is the length of the most frequent sentence in sentences that begins with the prompt, unless such a prompt does not 
+                                        exist (in which case findHighestFrequencyWord() should have a time complexity of O(1)). Thus, this is an output sensitive 
+                                        complexity.
+
+                This function will always assume the trie traversal is already at the desired prefix node. By only storing the max_frequency amongst all leaf
+                nodes below the prefix node, we can easily traverse down only the children with the highest max_frequency. Since we previously updated the
+                max_frequency variable to be the highest frequency of a particular leaf node, we can easily traverse down to obtain characters that make up
+                the most frequent sentence in sentences by simply following the one child node with the highest max_frequency rather than manually traversing down 
+                to each leaf node from the children of the prefix node. On a tie the child with the smallest char is followed. The descent is a loop, so
+                long sentences do not run into the recursion limit, and the chars are only joined into a word once at the end.
+
+        """
+        chars = []
+        highest_len = -1
+
+        while True:
+            if current.last and current.frequency > highest_freq:
+                highest_freq = current.frequency
+                highest_len = len(chars)
+
+            max_child = None
+            max_child_char = None
+            for char, child in self.children(current):
+                if child.max_frequency > 0 and (max_child is None or child.max_frequency > max_child.max_frequency
+                                                 or (child.max_frequency == max_child.max_frequency and char < max_child_char)):
+                    max_child = child
+                    max_child_char = char
+
+            if max_child is None:
+                break
+            chars.append(max_child_char)
+            current = max_child
+
+        if highest_len != -1:
+            highest_word = prefix + "".join(chars[:highest_len])
+
+        return highest_freq, highest_word
 
     def autoComplete(self, prompt):
         """
@@ -483,9 +2854,10 @@ class CatsTrie:
 
         """
         current = self.root
+        prompt = self.encode(prompt)
 
         for char in prompt:
-            index = ord(char) - 97 + 1
+            index = self.slot(char)
             if current.link[index] is None:
                 return None
             current = current.link[index]
@@ -495,4 +2867,893 @@ class CatsTrie:
 
         highest_freq, highest_word = self.findHighestFrequencyWord(current, prompt, highest_freq, highest_word)
 
-        return highest_word
\ No newline at end of file
+        return self.decode(highest_word)
+
+    def autoComplete_many(self, prompts):
+        """
+            Function description: 
+                Batch version of autoComplete(). The prompts are visited in sorted order while a stack keeps the path of nodes of the previous prompt,
+                so each prompt only walks down from the end of its longest common prefix with the previous one instead of from the root. Repeated
+                prompts are only answered once.
+
+            :Input:
+            argv1: The list of prompts
+
+            :Output, return or postcondition: Returns the list of auto-completed sentences, in the same order as prompts (None where no sentence
+                                                begins with the prompt)
+
+            :Time complexity: O(P log P + S + Y), where P is the number of prompts, S is the total length of the prompts that is not shared with
+                                the previous prompt in sorted order, and Y is the total length of the completions returned.
+
+        """
+        prompts = [self.encode(prompt) for prompt in prompts]
+        results = [None] * len(prompts)
+        stack = [self.root]
+        previous = None
+        previous_result = None
+
+        for i in sorted(range(len(prompts)), key=prompts.__getitem__):
+            prompt = prompts[i]
+            if prompt == previous:
+                results[i] = previous_result
+                continue
+
+            # Keep the nodes of the common prefix with the previous prompt
+            common = 0
+            if previous is not None:
+                while common < len(prompt) and common < len(previous) and prompt[common] == previous[common]:
+                    common += 1
+            del stack[common + 1:]
+
+            # Walk down the rest of the prompt, stopping as soon as a char is missing
+            for char in prompt[len(stack) - 1:]:
+                child = stack[-1].link[self.slot(char)]
+                if child is None:
+                    break
+                stack.append(child)
+
+            if len(stack) == len(prompt) + 1:
+                previous_result = self.decode(self.findHighestFrequencyWord(stack[-1], prompt, -1, None)[1])
+            else:
+                previous_result = None
+            results[i] = previous_result
+            previous = prompt
+
+        return results
+
+    def autoComplete_topk(self, prompt, k):
+        """
+            Function description: 
+                Returns the k most frequent sentences that begin with the prompt, most frequent first and alphabetically on ties, so the first one is the
+                sentence returned by autoComplete(). The answer is read straight from the top-k list cached at the prefix node.
+
+            :Input:
+            argv1: The prompt
+            argv2: The number of completions
+
+            :Preconditions:
+                1. The CatsTrie must have been built with top_k >= k
+
+            :Raises ValueError: When top-k lists are disabled, or k is negative or larger than top_k
+
+            :Output, return or postcondition: Returns the list of up to k completions, empty if no sentence begins with the prompt
+
+            :Time complexity: O(X+k), where X is the length of the prompt, no matter how many sentences begin with the prompt.
+
+        """
+        if not self.top_k:
+            raise ValueError("top-k lists are disabled, build the CatsTrie with top_k > 0 to use autoComplete_topk()")
+        if not 0 <= k <= self.top_k:
+            raise ValueError("k must be between 0 and top_k (" + str(self.top_k) + "), got " + str(k))
+
+        current = self.root
+        for char in self.encode(prompt):
+            index = self.slot(char)
+            if current.link[index] is None:
+                return []
+            current = current.link[index]
+
+        return [self.decode(node.sentence) for node in current.top[:k]]
+
+    def autoComplete_fuzzy(self, prompt, max_edits):
+        """
+            Function description: 
+                Typo tolerant version of autoComplete(). A sentence matches when some prefix of it is within max_edits insertions, deletions or
+                substitutions of the prompt, and the most frequent match is returned, with fewer edits and then alphabetical order breaking ties.
+                Every node keeps one row of the Levenshtein table: the row of a node holds the edit distance between every prefix of the prompt and
+                the word spelled by the node, and is computed from the row of its parent. Whenever the last cell is within max_edits, every sentence
+                below the node matches and the best of them is found with findHighestFrequencyWord(). A child is never visited when the smallest
+                cell of its row is over max_edits, since the rows of its descendants can only be larger.
+
+                The nodes are visited best-first from a heap keyed by (-max_frequency, smallest cell of the row). No descendant of a node has a
+                smaller key, so once the key of the next node cannot beat the best match so far, nothing left can and the search stops. A node that
+                ties is skipped when every sentence below it comes later alphabetically than the best match.
+
+                In byte mode the edits are counted in chars, not bytes. The bytes of a multi-byte char are gathered in pending on the way down, and a
+                node inside a char keeps the row of its parent and is never a match; the row is only computed once the char is complete.
+
+            :Input:
+            argv1: The prompt
+            argv2: The number of edits allowed
+
+            :Output, return or postcondition: Returns the auto-completed sentence, or None if no sentence is within max_edits of the prompt.
+
+            :Time complexity: O(V*X*A + Y), where V is the number of nodes within max_edits of a prefix of the prompt that are not pruned, X is the
+                                length of the prompt, A is the size of the alphabet and Y is the total length of the completions found. With
+                                max_edits = 0 this is O(X*A + Y).
+
+        """
+        best = None
+        # Words are unique, so the heap never compares rows or nodes
+        root = self.root
+        heap = [(-root.max_frequency, 0, "", list(range(len(prompt) + 1)), root, "")]
+
+        while heap:
+            negative_freq, lowest, word, row, node, pending = heapq.heappop(heap)
+            if negative_freq == 0:
+                break
+            if best is not None:
+                if (negative_freq, lowest) > best[:2]:
+                    break
+                # Every sentence below node starts with word, so it is compared with the same number of chars of the best match
+                if (negative_freq, lowest, word) > (best[0], best[1], best[2][:len(word)]):
+                    continue
+
+            edits = row[-1]
+            if not pending and edits <= max_edits and (best is None or (negative_freq, edits, word) <= (best[0], best[1], best[2][:len(word)])):
+                highest_freq, highest_word = self.findHighestFrequencyWord(node, word, -1, None)
+                candidate = (-highest_freq, edits, highest_word)
+                if best is None or candidate < best:
+                    best = candidate
+
+            for char, child in self.children(node):
+                letter = char
+                if self.byte_mode:
+                    # Number of bytes of the UTF-8 char, from its lead byte
+                    lead = ord(pending[0] if pending else char)
+                    needed = 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+                    if len(pending) + 1 < needed:
+                        heapq.heappush(heap, (-child.max_frequency, lowest, word + char, row, child, pending + char))
+                        continue
+                    letter = self.decode(pending + char)
+
+                cell = row[0] + 1
+                child_row = [cell]
+                child_lowest = cell
+                for j in range(1, len(row)):
+                    # Cheapest of deleting, inserting or matching/substituting prompt[j - 1]
+                    cell = (row[j] if row[j] < cell else cell) + 1
+                    diagonal = row[j - 1] + (prompt[j - 1] != letter)
+                    if diagonal < cell:
+                        cell = diagonal
+                    child_row.append(cell)
+                    if cell < child_lowest:
+                        child_lowest = cell
+                if child_lowest <= max_edits:
+                    heapq.heappush(heap, (-child.max_frequency, child_lowest, word + char, child_row, child, ""))
+
+        return self.decode(best[2]) if best is not None else None
+
+    def items(self):
+        """
+            Generator of the (sentence, frequency) pairs of every sentence in the Trie, in alphabetical order, walking the Trie without recursion
+
+        """
+        stack = [(self.root, "")]
+        while stack:
+            node, key = stack.pop()
+            if node.last:
+                yield self.decode(key), node.frequency
+            for char, child in sorted(self.children(node), reverse=True):
+                stack.append((child, key + char))
+
+    def build_infix_index(self):
+        """
+            Function description: 
+                Builds an InfixIndex over the sentences of the Trie for autoComplete_infix(). The index is a snapshot: it does not follow later
+                insert() or add_count() calls, so it should be built again after updating the Trie.
+
+            :Time complexity: O(L*A), where L is the total length of the distinct sentences and A is the size of the alphabet.
+
+        """
+        self.infix = InfixIndex(self.items())
+        return self.infix
+
+    def autoComplete_infix(self, substring):
+        """
+            Function description: 
+                Returns the most frequent sentence that contains substring anywhere, not only at the start, alphabetically on ties. Needs
+                build_infix_index() to have been called.
+
+            :Input:
+            argv1: The substring
+
+            :Output, return or postcondition: Returns the sentence, or None if no sentence contains substring
+
+            :Time complexity: O(Z), where Z is the length of substring, no matter how many sentences there are.
+
+        """
+        if self.infix is None:
+            raise ValueError("build_infix_index() must be called before autoComplete_infix()")
+        return self.infix.find(substring)
+
+    def flatten(self):
+        """
+            Function description: 
+                Flattens the Trie into four columns, numbering the nodes in breadth-first order with the children of every node in increasing order
+                of char. The children of a node then have consecutive numbers, so the child table needs no pointers: first_child[v] is the number of
+                the first child of node v and first_child[v + 1] is one past its last child. char[v] is the char on the link into node v (as its code,
+                or its byte in byte mode), and frequency[v] and max_frequency[v] are copied from the node. The root is node 0.
+
+            :Output, return or postcondition: Returns (first_child, char, frequency, max_frequency) as arrays
+
+            :Time complexity: O(T*A), where T is the number of nodes and A is the size of the alphabet (27), or O(T log T) in byte mode.
+
+        """
+        first_child = array("q", [1])
+        char = array("B", [0])
+        frequency = array("q")
+        max_frequency = array("q")
+
+        queue = [self.root]
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            frequency.append(node.frequency if node.last else 0)
+            max_frequency.append(node.max_frequency)
+            for child_char, child in sorted(self.children(node)):
+                char.append(ord(child_char))
+                queue.append(child)
+            first_child.append(len(queue))
+
+        return first_child, char, frequency, max_frequency
+
+    def save(self, path):
+        """
+            Function description: 
+                Saves the Trie to a flat binary file: a small header followed by the columns of flatten(), each 8 byte aligned, so that load() can
+                map them straight from the file. The top-k lists are not saved.
+
+            :Input:
+            argv1: The path of the file to write
+
+            :Time complexity: O(T*A), see flatten()
+
+        """
+        MappedCatsTrie(*self.flatten(), byte_mode=self.byte_mode).save(path)
+
+    @staticmethod
+    def load(path):
+        """
+            Function description: 
+                Loads a Trie saved by save() by memory mapping the file read-only. No Node is created: the returned MappedCatsTrie answers autoComplete()
+                straight from the mapped columns, so loading takes constant time and every process that loads the same file shares one copy of it
+                through the page cache.
+
+            :Input:
+            argv1: The path of the file to load
+
+            :Output, return or postcondition: Returns a read-only MappedCatsTrie
+
+            :Time complexity: O(1); the columns are paged in lazily by the queries
+
+        """
+        with open(path, "rb") as file:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        buffer = memoryview(mapping)
+        magic, version, byte_order, node_count, byte_mode = _CATS_TRIE_HEADER.unpack_from(buffer)
+        if magic != CATS_TRIE_MAGIC or version != CATS_TRIE_VERSION:
+            raise ValueError(path + " is not a version " + str(CATS_TRIE_VERSION) + " cats trie")
+        if byte_order != 0x01020304:
+            raise ValueError(path + " was saved on a machine with a different byte order than " + sys.byteorder)
+
+        layout, size = aligned_layout((("q", node_count + 1), ("B", node_count), ("q", node_count), ("q", node_count)), _CATS_TRIE_HEADER.size)
+        if len(mapping) < size:
+            raise ValueError(path + " is truncated")
+
+        columns = [buffer[offset:offset + array(typecode).itemsize * length].cast(typecode) for typecode, offset, length in layout]
+        return MappedCatsTrie(*columns, byte_mode=bool(byte_mode))
+
+    @classmethod
+    def from_flat(cls, first_child, char, frequency, max_frequency, top_k=0, byte_mode=False):
+        """
+            Function description: 
+                Inverse of flatten(): rebuilds the Node objects of a Trie from its columns, without any recursion. The nodes are numbered breadth-first,
+                so every child has a larger number than its parent and the top-k lists, if enabled, can be merged bottom-up by going through the nodes
+                in reverse.
+
+            :Input:
+            argv1-4: The columns returned by flatten(), or of a MappedCatsTrie
+            argv5: The number of completions to keep at every node for autoComplete_topk(), 0 to disable it
+            argv6: Whether the columns are of a byte mode Trie
+
+            :Output, return or postcondition: Returns the new CatsTrie
+
+            :Time complexity: O(T), where T is the number of nodes, or O(T*K log K + NM) with top-k lists.
+
+        """
+        trie = cls([], top_k, byte_mode)
+        nodes = [trie.root]
+        parent = [-1]
+        for v in range(len(char)):
+            node = nodes[v]
+            node.frequency = frequency[v]
+            node.last = frequency[v] > 0
+            node.max_frequency = max_frequency[v]
+            for child in range(first_child[v], first_child[v + 1]):
+                child_char = chr(char[child])
+                nodes.append(trie.new_node(child_char))
+                parent.append(v)
+                node.link[trie.slot(child_char)] = nodes[child]
+
+        if top_k:
+            for v in range(len(nodes) - 1, -1, -1):
+                node = nodes[v]
+                entries = []
+                if node.last:
+                    # Spell the sentence by walking up to the root
+                    chars = []
+                    u = v
+                    while u > 0:
+                        chars.append(nodes[u].char)
+                        u = parent[u]
+                    node.sentence = "".join(reversed(chars))
+                    entries.append(node)
+                for child_char, child in trie.children(node):
+                    entries.extend(child.top)
+                entries.sort(key=trie.top_order)
+                node.top = entries[:top_k]
+
+        return trie
+
+    @staticmethod
+    def from_sentences_parallel(sentences, processes=None, byte_mode=False):
+        """
+            Function description: 
+                Parallel bulk builder. The sentences are partitioned by their first char (first byte in byte mode), so that no two shards share a node
+                below the root, and every shard is sorted, counted and flattened by flat_levels() in a worker of a process pool, without creating any
+                Node. Since the nodes of every level of a flattened Trie are in alphabetical order of their prefixes, the flat Trie of all the
+                sentences is the shards' levels put side by side, level by level in order of first char. The parent only concatenates the columns and
+                takes a running sum of the child counts for first_child, which are all done by array operations rather than per node in Python.
+
+                The result is the same as CatsTrie.from_sentences(sentences).flatten(), served read-only by a MappedCatsTrie, which can be saved with
+                MappedCatsTrie.save() or turned into a CatsTrie with CatsTrie.from_flat().
+
+            :Input:
+            argv1: The list of sentences
+            argv2: The number of worker processes, None for one per CPU, or 1 to build every shard in this process
+            argv3: Whether to build a byte mode Trie, see CatsTrie.__init__
+
+            :Output, return or postcondition: Returns the MappedCatsTrie
+
+            :Time complexity: O(NM log N) in total, as from_sentences(), spread over up to A shards, where A is the size of the alphabet, plus O(T)
+                                array operations in the parent, where T is the number of nodes.
+
+        """
+        shards = {}
+        empty = 0
+        for sentence in sentences:
+            if sentence:
+                first = chr(sentence[0].encode("utf-8")[0]) if byte_mode else sentence[0]
+                shards.setdefault(first, []).append(sentence)
+            else:
+                empty += 1
+
+        # Hand the shards over in order of first char, dropping them from this process as they go
+        tasks = ((shards.pop(first), byte_mode) for first in sorted(shards))
+        if processes == 1:
+            results = list(map(_build_trie_shard, tasks))
+        else:
+            with Pool(processes) as pool:
+                results = pool.map(_build_trie_shard, tasks)
+
+        char = array("B", [0])
+        frequency = array("q", [empty])
+        max_frequency = array("q", [max([empty] + [result[0] for result in results])])
+        children = array("q", [len(results)])
+        depth = 0
+        while True:
+            levels = [result[1][depth] for result in results if depth < len(result[1])]
+            if not levels:
+                break
+            for level_char, level_frequency, level_max_frequency, level_children in levels:
+                char.extend(level_char)
+                frequency.extend(level_frequency)
+                max_frequency.extend(level_max_frequency)
+                children.extend(level_children)
+            depth += 1
+
+        first_child = array("q", accumulate(children, initial=1))
+        return MappedCatsTrie(first_child, char, frequency, max_frequency, byte_mode)
+
+    @staticmethod
+    def flat_levels(counts):
+        """
+            Function description: 
+                Flattens the Trie of (key, count) pairs, sorted by key with no repeated keys and already encoded, straight into the columns of
+                flatten() one level at a time, without creating any Node. The nodes at depth d are the distinct prefixes of length d, and they appear
+                in alphabetical order while going through the sorted keys, which is their breadth-first order. Every key adds one node per char past
+                its common prefix with the previous key, the parent of a node being the last node one level up. As in build_sorted(), a stack of the
+                max_frequency of the nodes on the path is handed up to the parents as they are finished.
+
+            :Input:
+            argv1: The (key, count) pairs, sorted by key
+
+            :Output, return or postcondition: Returns (root_max_frequency, root_frequency, root_children, levels), where levels[d] holds the
+                                                (char, frequency, max_frequency, children) columns of the nodes at depth d + 1, children being
+                                                the number of children of each node
+
+            :Time complexity: O(NM), where N is the number of pairs and M is the number of characters in the longest key.
+
+        """
+        levels = []
+        root_frequency = 0
+        root_children = 0
+        path = [0]
+        previous = None
+
+        for key, count in counts:
+            common = 0
+            if previous is not None:
+                while common < len(key) and common < len(previous) and key[common] == previous[common]:
+                    common += 1
+
+            # Finish the nodes that are not shared with this key; each one is the last node of its level
+            while len(path) > common + 1:
+                highest = path.pop()
+                levels[len(path) - 1][2][-1] = highest
+                if highest > path[-1]:
+                    path[-1] = highest
+
+            for depth in range(common + 1, len(key) + 1):
+                if depth > len(levels):
+                    levels.append((array("B"), array("q"), array("q"), array("q")))
+                level_char, level_frequency, level_max_frequency, level_children = levels[depth - 1]
+                level_char.append(ord(key[depth - 1]))
+                level_frequency.append(0)
+                level_max_frequency.append(0)
+                level_children.append(0)
+                if depth > 1:
+                    levels[depth - 2][3][-1] += 1
+                else:
+                    root_children += 1
+                path.append(0)
+
+            if key:
+                levels[len(key) - 1][1][-1] = count
+            else:
+                root_frequency = count
+            path[-1] = max(path[-1], count)
+            previous = key
+
+        while len(path) > 1:
+            highest = path.pop()
+            levels[len(path) - 1][2][-1] = highest
+            path[-1] = max(path[-1], highest)
+
+        return path[0], root_frequency, root_children, levels
+
+def _build_trie_shard(task):
+    sentences, byte_mode = task
+    counts = []
+    for sentence in sorted(sentences):
+        if counts and counts[-1][0] == sentence:
+            counts[-1][1] += 1
+        else:
+            counts.append([sentence, 1])
+    if byte_mode:
+        for pair in counts:
+            pair[0] = pair[0].encode("utf-8").decode("latin-1")
+    root_max_frequency, root_frequency, root_children, levels = CatsTrie.flat_levels(counts)
+    return root_max_frequency, levels
+
+# Magic, version, byte order mark, node count and byte mode
+CATS_TRIE_MAGIC = b"CATSTRIE"
+CATS_TRIE_VERSION = 1
+_CATS_TRIE_HEADER = struct.Struct("=8sIIqq")
+
+class MappedCatsTrie:
+    """
+    Read-only CatsTrie made of the flat columns of CatsTrie.flatten(), usually mapped from a file by CatsTrie.load()
+     - Gives the same autoComplete results as the CatsTrie it was made from, without any Node objects
+
+    """
+    encode = CatsTrie.encode
+    decode = CatsTrie.decode
+
+    def __init__(self, first_child, char, frequency, max_frequency, byte_mode=False):
+        """
+            Function description: 
+                Wraps the columns, which may be arrays or memoryviews into a mapped file. See CatsTrie.flatten() for their meaning.
+
+        """
+        self.first_child = first_child
+        self.char = char
+        self.frequency = frequency
+        self.max_frequency = max_frequency
+        self.byte_mode = byte_mode
+
+    def __len__(self):
+        return len(self.char)
+
+    def save(self, path):
+        """
+            Function description: 
+                Saves the columns to a flat binary file: a small header followed by the columns, each 8 byte aligned, so that CatsTrie.load() can map
+                them straight from the file.
+
+            :Input:
+            argv1: The path of the file to write
+
+            :Time complexity: O(T), where T is the number of nodes
+
+        """
+        columns = (self.first_child, self.char, self.frequency, self.max_frequency)
+        layout, size = aligned_layout(zip(("q", "B", "q", "q"), map(len, columns)), _CATS_TRIE_HEADER.size)
+
+        with open(path, "wb") as file:
+            file.write(_CATS_TRIE_HEADER.pack(CATS_TRIE_MAGIC, CATS_TRIE_VERSION, 0x01020304, len(self.char), int(self.byte_mode)))
+            for values, (typecode, offset, length) in zip(columns, layout):
+                file.write(bytes(offset - file.tell()))
+                file.write(array(typecode, values).tobytes())
+
+    def find(self, prompt):
+        """
+            Function used to find the node reached by prompt (already encoded), or -1 if there is none. The children of a node are sorted by char,
+            so each char is found with a binary search.
+
+            :Time complexity: O(X log A), where X is the length of the prompt and A is the size of the alphabet.
+
+        """
+        node = 0
+        for char in prompt:
+            code = ord(char)
+            start = self.first_child[node]
+            end = self.first_child[node + 1]
+            node = bisect.bisect_left(self.char, code, start, end)
+            if node == end or self.char[node] != code:
+                return -1
+        return node
+
+    def autoComplete(self, prompt):
+        """
+            Function description: 
+                Same as CatsTrie.autoComplete. From the node of the prompt it follows the child with the highest max_frequency down to the most
+                frequent sentence. The children are scanned in increasing order of char, so ties go to the smallest char like in CatsTrie.
+
+            :Input:
+            argv1: The prompt
+
+            :Output, return or postcondition: Returns the auto-completed sentence based on the prompt given, or None if no sentence starts with it.
+
+            :Time complexity: O(X log A + Y*A), where X is the length of the prompt, Y is the length of the most frequent sentence that begins with it
+                                and A is the size of the alphabet.
+
+        """
+        prompt = self.encode(prompt)
+        node = self.find(prompt)
+        if node == -1:
+            return None
+
+        chars = []
+        highest_freq = 0
+        highest_len = -1
+        while True:
+            if self.frequency[node] > highest_freq:
+                highest_freq = self.frequency[node]
+                highest_len = len(chars)
+
+            best = -1
+            best_freq = 0
+            for child in range(self.first_child[node], self.first_child[node + 1]):
+                if self.max_frequency[child] > best_freq:
+                    best = child
+                    best_freq = self.max_frequency[child]
+
+            if best == -1:
+                break
+            chars.append(chr(self.char[best]))
+            node = best
+
+        if highest_len == -1:
+            return None
+        return self.decode(prompt + "".join(chars[:highest_len]))
+
+class InfixIndex:
+    """
+    Substring index for CatsTrie.autoComplete_infix()
+     - A generalized suffix automaton over the distinct sentences, where every state knows the best sentence containing the substrings it stands for
+
+    """
+    def __init__(self, counts):
+        """
+            Function description: 
+                Builds the suffix automaton one sentence at a time, starting each one again from the initial state. The states are kept in parallel
+                lists: transitions (a dict of char to state), suffix link, length of the longest substring, and best, the index of the best sentence
+                that ends at the state. After each char, the state of the prefix read so far has the sentence as one of its end positions, so the
+                sentence is offered to it. A sentence that contains a substring also contains every suffix of it, so the best sentences are then
+                handed along the suffix links, going through the states in decreasing order of length so that every state is finished before its link.
+
+            :Input:
+            argv1: The (sentence, frequency) pairs, with distinct sentences
+
+            :Time complexity: O(L*A), where L is the total length of the sentences and A is the size of the alphabet.
+
+            :Aux space complexity: O(L*A), since there are at most 2L states.
+
+        """
+        self.sentences = []
+        self.frequencies = []
+        self.transitions = [{}]
+        self.link = [-1]
+        self.length = [0]
+        self.best = [-1]
+
+        for sentence, frequency in counts:
+            index = len(self.sentences)
+            self.sentences.append(sentence)
+            self.frequencies.append(frequency)
+            last = 0
+            self.offer(last, index)
+            for char in sentence:
+                last = self.extend(last, char)
+                self.offer(last, index)
+
+        # Counting sort of the states by length, longest first
+        buckets = [[] for _ in range(max(self.length) + 1)]
+        for state in range(len(self.length)):
+            buckets[self.length[state]].append(state)
+        for bucket in reversed(buckets):
+            for state in bucket:
+                if self.link[state] != -1 and self.best[state] != -1:
+                    self.offer(self.link[state], self.best[state])
+
+    def offer(self, state, index):
+        """
+            Function used to make sentence index the best of state if it is more frequent, or as frequent and alphabetically smaller
+
+        """
+        best = self.best[state]
+        if best == -1 or (-self.frequencies[index], self.sentences[index]) < (-self.frequencies[best], self.sentences[best]):
+            self.best[state] = index
+
+    def new_state(self, length, link, transitions):
+        """
+            Function used to append a state to the parallel lists and return its number
+
+        """
+        self.transitions.append(transitions)
+        self.link.append(link)
+        self.length.append(length)
+        self.best.append(-1)
+        return len(self.length) - 1
+
+    def clone(self, p, q, char):
+        """
+            Function used by extend() to split state q, reached from p with char, so that the substrings of length up to length[p] + 1 get a state
+            of their own. Returns the clone.
+
+        """
+        clone = self.new_state(self.length[p] + 1, self.link[q], dict(self.transitions[q]))
+        self.link[q] = clone
+        while p != -1 and self.transitions[p].get(char) == q:
+            self.transitions[p][char] = clone
+            p = self.link[p]
+        return clone
+
+    def extend(self, last, char):
+        """
+            Function description: 
+                Adds char after the prefix whose state is last and returns the state of the longer prefix. This is the usual suffix automaton
+                extension, except that the transition may already exist because another sentence shares the prefix.
+
+            :Time complexity: O(A) amortized, where A is the size of the alphabet, for copying the transitions of a clone.
+
+        """
+        q = self.transitions[last].get(char)
+        if q is not None:
+            if self.length[q] == self.length[last] + 1:
+                return q
+            return self.clone(last, q, char)
+
+        current = self.new_state(self.length[last] + 1, 0, {})
+        p = last
+        while p != -1 and char not in self.transitions[p]:
+            self.transitions[p][char] = current
+            p = self.link[p]
+
+        if p != -1:
+            q = self.transitions[p][char]
+            if self.length[q] == self.length[p] + 1:
+                self.link[current] = q
+            else:
+                self.link[current] = self.clone(p, q, char)
+        return current
+
+    def find(self, substring):
+        """
+            Function description: 
+                Follows the transitions of substring from the initial state and returns the best sentence of the state reached.
+
+            :Output, return or postcondition: Returns the most frequent sentence containing substring, or None if there is none
+
+            :Time complexity: O(Z), where Z is the length of substring.
+
+        """
+        state = 0
+        for char in substring:
+            state = self.transitions[state].get(char)
+            if state is None:
+                return None
+        best = self.best[state]
+        return self.sentences[best] if best != -1 else None
+
+class RadixNode:
+    """
+    Node Class for RadixCatsTrie
+     - Each node depicts a whole run of chars (label) instead of a single char, so chains of single-child nodes are collapsed into one node
+     - Children are kept in a dict keyed by the first char of their label, or None for a leaf, so only the children that exist take up space
+
+    """
+    __slots__ = ("label", "children", "frequency", "max_frequency")
+
+    def __init__(self, label="", frequency=0):
+        self.label = label
+        self.children = None
+        self.frequency = frequency
+        self.max_frequency = frequency
+
+class RadixCatsTrie:
+    """
+    Radix (Patricia) compressed version of CatsTrie
+     - Gives the same autoComplete results as CatsTrie, using far fewer nodes and no 27 slot link lists
+
+    """
+    def __init__(self, sentences):
+        """
+            Function description: 
+                Initializes the RadixCatsTrie by inserting every sentence into an empty root node.
+
+            :Input:
+            argv1: The list of sentences
+
+            :Time complexity: O(NM), where N is the number of sentence in sentences and M is the number of characters in the longest sentence.
+
+            :Aux space complexity: O(N), counted in nodes, since every sentence adds at most two nodes. The labels take O(NM) characters.
+
+        """
+        self.root = RadixNode()
+        for sentence in sentences:
+            self.insert(sentence)
+
+    def insert(self, key, count=1):
+        """
+            Function description: 
+                Inserts key count times. It walks down the labels that match key, splits the label where key leaves it if needed, and hangs the rest of
+                key off as a new leaf. The max_frequency of every node on the path is then raised to the new frequency of key if that is larger.
+
+            :Input:
+            argv1: The key that needs to be inserted into the trie data structure
+            argv2: The number of times to insert it
+
+            :Time complexity: O(M), M is the length of the sentence.
+
+        """
+        current = self.root
+        path = [current]
+        key_pos = 0
+
+        while key_pos < len(key):
+            if current.children is None:
+                current.children = {}
+            child = current.children.get(key[key_pos])
+
+            if child is None:
+                # Nothing shares the rest of the key, so it becomes a single leaf
+                child = RadixNode(key[key_pos:])
+                current.children[key[key_pos]] = child
+                current = child
+                path.append(current)
+                break
+
+            # Find how much of the label matches the key
+            label = child.label
+            common = 0
+            while common < len(label) and key_pos + common < len(key) and label[common] == key[key_pos + common]:
+                common += 1
+
+            if common < len(label):
+                # The key leaves the label part way, so split the label there
+                middle = RadixNode(label[:common])
+                middle.max_frequency = child.max_frequency
+                child.label = label[common:]
+                middle.children = {child.label[0]: child}
+                current.children[key[key_pos]] = middle
+                child = middle
+
+            current = child
+            path.append(current)
+            key_pos += common
+
+        current.frequency += count
+        for node in path:
+            node.max_frequency = max(node.max_frequency, current.frequency)
+
+    def autoComplete(self, prompt):
+        """
+            Function description: 
+                Same as CatsTrie.autoComplete. The prompt may end part way through a label, in which case the rest of that label is part of every
+                completion. Ties are broken exactly like CatsTrie, by preferring the child whose label starts with the smallest char.
+
+            :Input:
+            argv1: The prompt
+
+            :Output, return or postcondition: Returns the auto-completed sentence based on the prompt given, or None if no sentence starts with it.
+
+            :Time complexity: O(X+Y), where X is the length of the prompt and Y is the length of the most frequent sentence in sentences that begins with the 
+                                        prompt, unless such a prompt does not exist (in which case autoComplete() should have a time complexity of O(X)).
+
+        """
+        current = self.root
+        word = ""
+        prompt_pos = 0
+
+        while prompt_pos < len(prompt):
+            child = current.children.get(prompt[prompt_pos]) if current.children is not None else None
+            if child is None:
+                return None
+            rest = prompt[prompt_pos:prompt_pos + len(child.label)]
+            if not child.label.startswith(rest):
+                return None
+            word = word + child.label
+            prompt_pos += len(rest)
+            current = child
+
+        # Start from 0 so that the root of a Trie without sentences is not returned as the empty sentence
+        highest_freq = 0
+        highest_word = None
+        while True:
+            if current.frequency > highest_freq:
+                highest_freq = current.frequency
+                highest_word = word
+            if current.children is None:
+                break
+
+            best = None
+            for char, child in current.children.items():
+                if best is None or child.max_frequency > best.max_frequency or (child.max_frequency == best.max_frequency and char < best.label[0]):
+                    best = child
+            current = best
+            word = word + current.label
+
+        return highest_word
+
+def compareTrieMemory(sentences):
+    """
+        Memory comparison between CatsTrie and RadixCatsTrie. Builds both from sentences under tracemalloc and returns a tuple of
+        (cats_trie_bytes, radix_trie_bytes, cats_trie_nodes, radix_trie_nodes).
+
+    """
+    sentences = list(sentences)
+    results = []
+    for trie_class in (CatsTrie, RadixCatsTrie):
+        tracemalloc.start()
+        trie = trie_class(sentences)
+        results.append(tracemalloc.get_traced_memory()[0])
+        tracemalloc.stop()
+
+        nodes = 0
+        stack = [trie.root]
+        while stack:
+            node = stack.pop()
+            nodes += 1
+            if trie_class is CatsTrie:
+                stack.extend(child for char, child in trie.children(node))
+            elif node.children is not None:
+                stack.extend(node.children.values())
+        results.append(nodes)
+        del trie
+
+    return results[0], results[2], results[1], results[3]
@@ -0,0 +1,611 @@
+import unittest
+
+import asyncio
+import csv
+import importlib.util
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+from collections import deque
+
+# The module name has spaces in it, so it is loaded from its path
+_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Network Flow and Tries.py")
+_spec = importlib.util.spec_from_file_location("network_flow_and_tries", _path)
+nft = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = nft
+_spec.loader.exec_module(nft)
+
+EXAMPLE = ([(0, 1, 3000), (1, 2, 2000), (1, 3, 1000), (0, 3, 2000), (3, 4, 2000), (3, 2, 1000)],
+           [5000, 3000, 3000, 3000, 2000], [5000, 3000, 3000, 2500, 1500], 0, [4, 2])
+
+def reference_max_flow(vertex_count, edges, source, sink):
+    # Plain Edmonds-Karp on a capacity dict, independent of every engine in the module
+    capacity = {}
+    adjacent = [set() for _ in range(vertex_count)]
+    for u, v, c in edges:
+        capacity[(u, v)] = capacity.get((u, v), 0) + c
+        capacity.setdefault((v, u), 0)
+        adjacent[u].add(v)
+        adjacent[v].add(u)
+    flow = 0
+    while True:
+        previous = [-1] * vertex_count
+        previous[source] = source
+        queue = deque([source])
+        while queue and previous[sink] == -1:
+            u = queue.popleft()
+            for v in adjacent[u]:
+                if previous[v] == -1 and capacity[(u, v)] > 0:
+                    previous[v] = u
+                    queue.append(v)
+        if previous[sink] == -1:
+            return flow
+        bottleneck = min(capacity[(previous[v], v)] for v in path_to(previous, source, sink))
+        for v in path_to(previous, source, sink):
+            capacity[(previous[v], v)] -= bottleneck
+            capacity[(v, previous[v])] += bottleneck
+        flow += bottleneck
+
+def path_to(previous, source, sink):
+    v = sink
+    while v != source:
+        yield v
+        v = previous[v]
+
+def reference_throughput(connections, maxIn, maxOut, origins, targets, supplies=None):
+    n = len(maxIn)
+    edges = [(i, i + n, maxOut[i]) for i in range(n)]
+    edges += [(u + n, v, min(c, maxIn[v], maxOut[v])) for u, v, c in connections]
+    edges += [(t, 2 * n + 1, maxOut[t]) for t in targets]
+    edges += [(2 * n, origin, supply) for origin, supply in zip(origins, supplies or [maxOut[origin] for origin in origins])]
+    return reference_max_flow(2 * n + 2, edges, 2 * n, 2 * n + 1)
+
+def random_network(rng, data_center_count=None):
+    n = data_center_count or rng.randint(2, 9)
+    connections = []
+    for _ in range(rng.randint(0, n * n)):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:
+            connections.append((u, v, rng.randint(1, 30)))
+    maxIn = [rng.randint(1, 40) for _ in range(n)]
+    maxOut = [rng.randint(1, 40) for _ in range(n)]
+    origin = rng.randrange(n)
+    others = [i for i in range(n) if i != origin]
+    targets = rng.sample(others, rng.randint(1, len(others)))
+    return connections, maxIn, maxOut, origin, targets
+
+def assert_valid_flow(test, graph, source, sink, value):
+    # Capacity, skew symmetry and conservation of a ResidualGraph flow
+    for e in range(0, len(graph.to), 2):
+        test.assertTrue(0 <= graph.flow[e] <= graph.capacity[e])
+        test.assertEqual(graph.flow[e ^ 1], -graph.flow[e])
+    for u in range(graph.vertex_count):
+        net = 0
+        e = graph.head[u]
+        while e != -1:
+            net += graph.flow[e]
+            e = graph.next[e]
+        if u == source:
+            test.assertEqual(net, value)
+        elif u == sink:
+            test.assertEqual(net, -value)
+        else:
+            test.assertEqual(net, 0)
+
+def reference_complete(sentences, prompt):
+    counts = {}
+    for sentence in sentences:
+        counts[sentence] = counts.get(sentence, 0) + 1
+    matches = [(-count, sentence) for sentence, count in counts.items() if sentence.startswith(prompt)]
+    return min(matches)[1] if matches else None
+
+def random_sentences(rng, alphabet, count, length):
+    return ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, length))) for _ in range(rng.randint(1, count))]
+
+def levenshtein(a, b):
+    row = list(range(len(b) + 1))
+    for i, char in enumerate(a, 1):
+        new_row = [i]
+        for j, other in enumerate(b, 1):
+            new_row.append(min(row[j] + 1, new_row[j - 1] + 1, row[j - 1] + (char != other)))
+        row = new_row
+    return row[-1]
+
+class TestThroughput(unittest.TestCase):
+
+    def test_example(self):
+        for engine in ("ford_fulkerson", "dinic"):
+            self.assertEqual(nft.maxThroughput(*EXAMPLE, engine=engine), 4500)
+        self.assertRaises(ValueError, nft.maxThroughput, *EXAMPLE, engine="simplex")
+
+    def test_graph_engines_match_reference(self):
+        rng = random.Random(1)
+        for _ in range(150):
+            network = random_network(rng)
+            expected = reference_throughput(network[0], network[1], network[2], [network[3]], network[4])
+            for engine in ("ford_fulkerson", "dinic"):
+                self.assertEqual(nft.maxThroughput(*network, engine=engine), expected)
+
+    def test_array_backend(self):
+        rng = random.Random(2)
+        for _ in range(150):
+            network = random_network(rng)
+            expected = reference_throughput(network[0], network[1], network[2], [network[3]], network[4])
+            for engine in ("ford_fulkerson", "dinic"):
+                self.assertEqual(nft.maxThroughput(*network, engine=engine, backend="array"), expected)
+                graph, source, sink = nft.build_throughput_graph(*network, graph_class=nft.ResidualGraph)
+                value = getattr(graph, engine)(source, sink)
+                self.assertEqual(value, expected)
+                assert_valid_flow(self, graph, source, sink, value)
+
+    def test_push_relabel(self):
+        rng = random.Random(3)
+        self.assertEqual(nft.maxThroughput(*EXAMPLE, engine="push_relabel", backend="array"), 4500)
+        for _ in range(150):
+            network = random_network(rng)
+            expected = reference_throughput(network[0], network[1], network[2], [network[3]], network[4])
+            self.assertEqual(nft.maxThroughput(*network, engine="push_relabel", backend="array"), expected)
+            graph, source, sink = nft.build_throughput_graph(*network, graph_class=nft.ResidualGraph)
+            value = graph.push_relabel(source, sink)
+            assert_valid_flow(self, graph, source, sink, value)
+
+    def test_update_capacity(self):
+        rng = random.Random(4)
+        for _ in range(60):
+            graph, source, sink = nft.build_throughput_graph(*random_network(rng), graph_class=nft.ResidualGraph)
+            value = graph.dinic(source, sink)
+            for _ in range(8):
+                e = 2 * rng.randrange(len(graph.to) // 2)
+                value += graph.update_capacity(e, rng.randint(0, 40), source, sink)
+                assert_valid_flow(self, graph, source, sink, value)
+                fresh = nft.ResidualGraph.from_arrays(graph.head, graph.next, graph.to, graph.capacity, nft.array("q", bytes(8 * len(graph.to))))
+                self.assertEqual(value, fresh.dinic(source, sink))
+
+    def test_session(self):
+        rng = random.Random(5)
+        for _ in range(60):
+            connections, maxIn, maxOut, origin, targets = random_network(rng)
+            session = nft.ThroughputSession(connections, maxIn, maxOut, origin, targets)
+            targets = set(targets)
+            for _ in range(6):
+                action = rng.random()
+                if action < 0.5:
+                    u, v = rng.sample(range(len(maxIn)), 2)
+                    c = rng.randint(0, 30)
+                    result = session.set_capacity(u, v, c)
+                    # Parallel channels between u and v become one channel of capacity c
+                    connections = [connection for connection in connections if connection[:2] != (u, v)] + [(u, v, c)]
+                elif action < 0.75:
+                    t = rng.choice([i for i in range(len(maxIn)) if i != origin])
+                    result = session.add_target(t)
+                    targets.add(t)
+                elif len(targets) > 1:
+                    t = rng.choice(sorted(targets))
+                    result = session.remove_target(t)
+                    targets.discard(t)
+                else:
+                    continue
+                self.assertEqual(result, reference_throughput(connections, maxIn, maxOut, [origin], targets))
+
+    def test_contingency(self):
+        rng = random.Random(6)
+        for _ in range(20):
+            connections, maxIn, maxOut, origin, targets = random_network(rng)
+            expected = [(i, reference_throughput(connections[:i] + connections[i + 1:], maxIn, maxOut, [origin], targets)) for i in range(len(connections))]
+            self.assertEqual(sorted(nft.contingencyThroughput(connections, maxIn, maxOut, origin, targets, processes=1, chunk_size=5)), expected)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the workers need to inherit the module loaded from its path")
+    def test_contingency_workers(self):
+        rng = random.Random(7)
+        connections, maxIn, maxOut, origin, targets = random_network(rng, 8)
+        expected = [(i, reference_throughput(connections[:i] + connections[i + 1:], maxIn, maxOut, [origin], targets)) for i in range(len(connections))]
+        self.assertEqual(sorted(nft.contingencyThroughput(connections, maxIn, maxOut, origin, targets, processes=2, chunk_size=3)), expected)
+
+    def test_index_queries(self):
+        rng = random.Random(8)
+        for _ in range(30):
+            connections, maxIn, maxOut, origin, targets = random_network(rng)
+            index = nft.ThroughputIndex(connections, maxIn, maxOut)
+            queries = []
+            for _ in range(4):
+                origin = rng.randrange(len(maxIn))
+                targets = rng.sample([i for i in range(len(maxIn)) if i != origin], rng.randint(1, len(maxIn) - 1))
+                queries.append((origin, targets))
+                self.assertEqual(index.query(origin, targets), reference_throughput(connections, maxIn, maxOut, [origin], targets))
+            expected = [reference_throughput(connections, maxIn, maxOut, [origin], targets) for origin, targets in queries]
+            self.assertEqual(index.query_many(queries, processes=1), expected)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == "fork", "the workers need to inherit the module loaded from its path")
+    def test_index_workers(self):
+        rng = random.Random(9)
+        connections, maxIn, maxOut, origin, targets = random_network(rng, 8)
+        index = nft.ThroughputIndex(connections, maxIn, maxOut)
+        queries = [(u, [v]) for u in range(8) for v in range(8) if u != v]
+        expected = [reference_throughput(connections, maxIn, maxOut, [u], targets) for u, targets in queries]
+        self.assertEqual(index.query_many(queries, processes=2, chunk_size=7), expected)
+
+    def test_read_connections_csv(self):
+        connections = EXAMPLE[0]
+        with tempfile.TemporaryDirectory() as directory:
+            plain, header, semicolons, broken = (os.path.join(directory, name) for name in ("plain", "header", "semicolons", "broken"))
+            with open(plain, "w") as file:
+                file.write("".join("%d,%d,%d\n" % connection for connection in connections) + "\n")
+            with open(header, "w") as file:
+                file.write("u,v,capacity\n" + "".join("%d,%d,%d\n" % connection for connection in connections))
+            with open(semicolons, "w") as file:
+                file.write("".join("%d;%d;%d\n" % connection for connection in connections))
+            with open(broken, "w") as file:
+                file.write("0,1,3000\nu,v,capacity\n")
+
+            self.assertEqual(list(nft.read_connections_csv(plain)), connections)
+            self.assertEqual(list(nft.read_connections_csv(header)), connections)
+            self.assertEqual(list(nft.read_connections_csv(semicolons, delimiter=";")), connections)
+            # Only the first row may be a header
+            self.assertRaises(ValueError, list, nft.read_connections_csv(broken))
+            self.assertEqual(nft.maxThroughput(nft.read_connections_csv(header), *EXAMPLE[1:]), 4500)
+
+    def test_merge_parallel(self):
+        self.assertEqual(nft.merge_channels([(0, 1, 2), (1, 2, 3), (0, 1, 4), (1, 0, 5)]), [(0, 1, 6), (1, 2, 3), (1, 0, 5)])
+        rng = random.Random(10)
+        for _ in range(100):
+            connections, maxIn, maxOut, origin, targets = random_network(rng)
+            connections += [(u, v, rng.randint(1, 30)) for u, v, c in connections if rng.random() < 0.5]
+            expected = reference_throughput(connections, maxIn, maxOut, [origin], targets)
+            for backend in ("graph", "array"):
+                self.assertEqual(nft.maxThroughput(connections, maxIn, maxOut, origin, targets, "dinic", backend, merge_parallel=True), expected)
+
+    def test_vertex_backend(self):
+        rng = random.Random(11)
+        self.assertEqual(nft.maxThroughput(*EXAMPLE, backend="vertex"), 4500)
+        for _ in range(150):
+            network = random_network(rng)
+            expected = reference_throughput(network[0], network[1], network[2], [network[3]], network[4])
+            for engine in nft.VertexCapacityGraph.ENGINES:
+                self.assertEqual(nft.maxThroughput(*network, engine=engine, backend="vertex"), expected)
+        self.assertRaises(ValueError, nft.maxThroughput, *EXAMPLE, engine="dinic", backend="vertex")
+
+    def test_flow_statistics(self):
+        for backend in nft.FLOW_BACKENDS:
+            max_flow, statistics = nft.maxThroughput(*EXAMPLE, backend=backend, stats=True)
+            self.assertEqual(max_flow, 4500)
+            self.assertIsInstance(statistics, nft.FlowStatistics)
+            augmenting_paths, vertices_dequeued, edges_scanned, bottlenecks, build_time, solve_time = statistics.statistics()
+            # Every augmenting path is recorded with its bottleneck, and the bottlenecks add up to the max flow
+            self.assertEqual(augmenting_paths, len(bottlenecks))
+            self.assertEqual(sum(bottlenecks), 4500)
+            self.assertTrue(all(bottleneck > 0 for bottleneck in bottlenecks))
+            # Every augmenting path needs a BFS, and the last BFS finds no path
+            self.assertGreater(vertices_dequeued, augmenting_paths)
+            self.assertGreaterEqual(edges_scanned, augmenting_paths)
+            self.assertGreaterEqual(build_time, 0)
+            self.assertGreaterEqual(solve_time, 0)
+
+        # The other engines are timed but not counted
+        max_flow, statistics = nft.maxThroughput(*EXAMPLE, engine="dinic", backend="array", stats=True)
+        self.assertEqual(max_flow, 4500)
+        self.assertEqual(statistics.statistics()[:4], (0, 0, 0, []))
+        self.assertEqual(nft.maxThroughput(*EXAMPLE, stats=False), 4500)
+
+    def test_save_and_load(self):
+        rng = random.Random(12)
+        network = random_network(rng, 7)
+        graph, source, sink = nft.build_throughput_graph(*network, graph_class=nft.ResidualGraph)
+        with tempfile.TemporaryDirectory() as directory:
+            first, second = os.path.join(directory, "first"), os.path.join(directory, "second")
+            nft.save_throughput_graph(first, graph, source, sink)
+            loaded, source, sink = nft.load_throughput_graph(first)
+            # A loaded graph can be saved again unchanged
+            nft.save_throughput_graph(second, loaded, source, sink)
+            with open(first, "rb") as a, open(second, "rb") as b:
+                self.assertEqual(a.read(), b.read())
+            self.assertEqual(loaded.push_relabel(source, sink), reference_throughput(network[0], network[1], network[2], [network[3]], network[4]))
+            del loaded
+
+            with open(first, "r+b") as file:
+                file.truncate(os.path.getsize(first) - 8)
+            self.assertRaises(ValueError, nft.load_throughput_graph, first)
+
+    def test_multi_origin(self):
+        rng = random.Random(13)
+        for _ in range(60):
+            connections, maxIn, maxOut, origin, targets = random_network(rng)
+            origins = rng.sample(range(len(maxIn)), rng.randint(1, len(maxIn) - 1))
+            targets = [i for i in range(len(maxIn)) if i not in origins]
+            supplies = [rng.randint(0, 40) for _ in origins] if rng.random() < 0.5 else None
+            max_flow, contributions = nft.multiOriginThroughput(connections, maxIn, maxOut, origins, targets, supplies)
+            self.assertEqual(max_flow, reference_throughput(connections, maxIn, maxOut, origins, targets, supplies))
+            self.assertEqual(sorted(contributions), sorted(origins))
+            self.assertEqual(sum(contributions.values()), max_flow)
+            for origin, supply in zip(origins, supplies or [maxOut[origin] for origin in origins]):
+                self.assertTrue(0 <= contributions[origin] <= supply)
+            if len(origins) == 1 and supplies is None:
+                self.assertEqual(max_flow, nft.maxThroughput(connections, maxIn, maxOut, origins[0], targets))
+        self.assertRaises(ValueError, nft.multiOriginThroughput, *EXAMPLE[:3], [0, 1], [4], [10])
+
+    def test_generate_topology(self):
+        for kind in nft.TOPOLOGY_KINDS:
+            for channel_count in (1, 12, 257):
+                connections, maxIn, maxOut, origin, targets = nft.generate_topology(kind, channel_count, seed=3)
+                self.assertEqual(len(connections), channel_count)
+                self.assertEqual(len(maxIn), len(maxOut))
+                for u, v, c in connections:
+                    self.assertTrue(u != v and 0 <= u < len(maxIn) and 0 <= v < len(maxIn) and c > 0)
+                self.assertTrue(targets and origin not in targets and all(0 <= target < len(maxIn) for target in targets))
+                # The same seed always gives the same topology
+                self.assertEqual(nft.generate_topology(kind, channel_count, seed=3), (connections, maxIn, maxOut, origin, targets))
+            self.assertNotEqual(nft.generate_topology(kind, 257, seed=4), nft.generate_topology(kind, 257, seed=3))
+        self.assertRaises(ValueError, nft.generate_topology, "ring", 10)
+
+    def test_benchmark(self):
+        solvers = [("array", "dinic"), ("vertex", "ford_fulkerson")]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "benchmark.csv")
+            rows = nft.benchmarkFlowSolvers(path, kinds=("layered", "chain"), sizes=(50,), solvers=solvers)
+            with open(path, newline="") as file:
+                written = list(csv.reader(file))
+
+        self.assertEqual(written[0], list(nft.BENCHMARK_FIELDS))
+        self.assertEqual(written[1:], [[str(value) for value in row] for row in rows])
+        self.assertEqual([(row[0], row[1], row[3], row[4]) for row in rows],
+                         [(kind, 50, backend, engine) for kind in ("layered", "chain") for backend, engine in solvers])
+        for row in rows:
+            connections, maxIn, maxOut, origin, targets = nft.generate_topology(row[0], 50)
+            self.assertEqual(row[2], len(maxIn))
+            self.assertEqual(row[7], reference_throughput(connections, maxIn, maxOut, [origin], targets))
+
+class TestThroughputService(unittest.TestCase):
+
+    def setUp(self):
+        self.service = nft.ThroughputService()
+
+    def tearDown(self):
+        self.service.executor.shutdown()
+
+    def test_concurrent_requests(self):
+        connections, maxIn, maxOut, origin, targets = EXAMPLE
+
+        async def requests():
+            return await asyncio.gather(self.service.solve(connections, maxIn, maxOut, 0, [4, 2]), self.service.solve(connections, maxIn, maxOut, 99, [4]),
+                                        self.service.solve(connections, maxIn, maxOut, -1, [4]), self.service.solve(connections, maxIn, maxOut, 1, [4, 9]),
+                                        self.service.solve(connections, maxIn, maxOut, 1, [4]), return_exceptions=True)
+
+        results = asyncio.run(requests())
+        self.assertEqual(results[0], 4500)
+        for error in results[1:4]:
+            self.assertIsInstance(error, ValueError)
+        self.assertEqual(results[4], nft.maxThroughput(connections, maxIn, maxOut, 1, [4]))
+        # Only the answers are cached, and a cached answer is returned again
+        self.assertEqual(len(self.service.results), 2)
+        self.assertEqual(asyncio.run(self.service.solve(connections, maxIn, maxOut, 0, [4, 2])), 4500)
+
+    def test_failing_query_in_batch(self):
+        index, results = self.service._answer(None, EXAMPLE[:3], [(0, (4, 2)), (0, (4, 2)), (5, (4,))])
+        self.assertEqual(results[(0, (4, 2))], 4500)
+        self.assertIsInstance(results[(5, (4,))], IndexError)
+        # The index is left usable by the failing query
+        self.assertEqual(index.query(0, [4, 2]), 4500)
+
+    def test_socket(self):
+        async def session():
+            server = await self.service.start()
+            async with server:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                connections, maxIn, maxOut, origin, targets = EXAMPLE
+                writer.write((json.dumps({"id": 1, "connections": connections, "maxIn": maxIn, "maxOut": maxOut, "origin": 0, "targets": [4, 2]}) + "\n").encode())
+                writer.write(b"not json\n")
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in range(2)]
+                first = next(response for response in responses if response["id"] == 1)
+                writer.write((json.dumps({"id": 2, "topology": first["topology"], "origin": 0, "targets": [4, 2]}) + "\n").encode())
+                writer.write((json.dumps({"id": 3, "topology": "unknown", "origin": 0, "targets": [4]}) + "\n").encode())
+                await writer.drain()
+                responses += [json.loads(await reader.readline()) for _ in range(2)]
+                writer.close()
+                await writer.wait_closed()
+            return sorted(responses, key=lambda response: response["id"] or 0)
+
+        responses = asyncio.run(session())
+        self.assertIn("error", responses[0])
+        self.assertEqual([response.get("max_flow") for response in responses[1:]], [4500, 4500, None])
+        self.assertIn("KeyError", responses[3]["error"])
+
+class TestCatsTrie(unittest.TestCase):
+
+    def test_radix(self):
+        rng = random.Random(20)
+        for _ in range(150):
+            sentences = random_sentences(rng, "abc", 20, 5)
+            trie, radix = nft.CatsTrie(sentences), nft.RadixCatsTrie(sentences)
+            for _ in range(8):
+                prompt = "".join(rng.choice("abc") for _ in range(rng.randint(0, 3)))
+                expected = reference_complete(sentences, prompt)
+                self.assertEqual(trie.autoComplete(prompt), expected)
+                self.assertEqual(radix.autoComplete(prompt), expected)
+
+    def test_empty(self):
+        for trie in (nft.CatsTrie([]), nft.RadixCatsTrie([])):
+            self.assertIsNone(trie.autoComplete(""))
+            self.assertIsNone(trie.autoComplete("a"))
+
+    def test_bulk_builder(self):
+        rng = random.Random(21)
+        for _ in range(150):
+            sentences = random_sentences(rng, "abc", 20, 5)
+            trie = nft.CatsTrie.from_sentences(sentences)
+            presorted = nft.CatsTrie.from_sentences(sorted(sentences), presorted=True)
+            for prompt in ["", "a", "b", "ab", "cc"]:
+                expected = reference_complete(sentences, prompt)
+                self.assertEqual(trie.autoComplete(prompt), expected)
+                self.assertEqual(presorted.autoComplete(prompt), expected)
+        # No recursion, so long sentences are fine
+        self.assertEqual(nft.CatsTrie.from_sentences(["a" * 5000, "b"]).autoComplete("a"), "a" * 5000)
+        self.assertRaises(ValueError, nft.CatsTrie([]).build_sorted, [("b", 1), ("a", 1)])
+
+    def test_topk(self):
+        rng = random.Random(22)
+        for _ in range(100):
+            sentences = random_sentences(rng, "abc", 20, 4)
+            trie = nft.CatsTrie(sentences, top_k=3)
+            bulk = nft.CatsTrie.from_sentences(sentences, top_k=3)
+            for prompt in ["", "a", "b", "ab"]:
+                counts = {}
+                for sentence in sentences:
+                    if sentence.startswith(prompt):
+                        counts[sentence] = counts.get(sentence, 0) + 1
+                expected = [sentence for count, sentence in sorted((-count, sentence) for sentence, count in counts.items())][:3]
+                self.assertEqual(trie.autoComplete_topk(prompt, 3), expected)
+                self.assertEqual(bulk.autoComplete_topk(prompt, 3), expected)
+        self.assertRaises(ValueError, nft.CatsTrie(["ab"]).autoComplete_topk, "a", 0)
+        self.assertRaises(ValueError, nft.CatsTrie(["ab"], top_k=2).autoComplete_topk, "a", -1)
+        self.assertRaises(ValueError, nft.CatsTrie(["ab"], top_k=2).autoComplete_topk, "a", 3)
+
+    def test_autocomplete_many(self):
+        rng = random.Random(23)
+        for _ in range(100):
+            sentences = random_sentences(rng, "abc", 20, 5)
+            prompts = ["".join(rng.choice("abc") for _ in range(rng.randint(0, 3))) for _ in range(8)]
+            self.assertEqual(nft.CatsTrie(sentences).autoComplete_many(prompts), [reference_complete(sentences, prompt) for prompt in prompts])
+        self.assertEqual(nft.CatsTrie([]).autoComplete_many(["", "a"]), [None, None])
+
+    def test_add_count_and_remove(self):
+        rng = random.Random(24)
+        for _ in range(100):
+            sentences = random_sentences(rng, "abc", 15, 4)
+            trie = nft.CatsTrie(sentences, top_k=2)
+            for _ in range(10):
+                sentence = "".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+                if rng.random() < 0.5:
+                    delta = rng.randint(1, 3)
+                    trie.add_count(sentence, delta)
+                    sentences += [sentence] * delta
+                elif sentence in sentences:
+                    trie.remove(sentence)
+                    sentences = [other for other in sentences if other != sentence]
+                else:
+                    self.assertRaises(KeyError, trie.remove, sentence)
+                for prompt in ["", "a", "b", "ca"]:
+                    expected = reference_complete(sentences, prompt)
+                    self.assertEqual(trie.autoComplete(prompt), expected)
+                    self.assertEqual(trie.autoComplete_topk(prompt, 1), [expected] if expected else [])
+        self.assertRaises(ValueError, nft.CatsTrie(["ab"]).add_count, "ab", -2)
+
+    def test_byte_mode(self):
+        rng = random.Random(25)
+        for _ in range(100):
+            sentences = random_sentences(rng, "aZ é€😀", 15, 5)
+            trie = nft.CatsTrie(sentences, byte_mode=True)
+            for prompt in ["", "a", "é", "😀", "a é"]:
+                self.assertEqual(trie.autoComplete(prompt), reference_complete(sentences, prompt))
+
+    def test_save_and_load(self):
+        rng = random.Random(26)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trie")
+            for byte_mode in (False, True):
+                alphabet = "aé😀 " if byte_mode else "abcd"
+                sentences = random_sentences(rng, alphabet, 40, 6)
+                trie = nft.CatsTrie.from_sentences(sentences, byte_mode=byte_mode)
+                trie.save(path)
+                loaded = nft.CatsTrie.load(path)
+                for _ in range(20):
+                    prompt = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3)))
+                    self.assertEqual(loaded.autoComplete(prompt), trie.autoComplete(prompt))
+                del loaded
+
+    def test_parallel_builder(self):
+        rng = random.Random(27)
+        for _ in range(60):
+            byte_mode = rng.random() < 0.3
+            alphabet = "aé😀 " if byte_mode else "abcd"
+            sentences = random_sentences(rng, alphabet, 40, 6)
+            trie = nft.CatsTrie.from_sentences(sentences, byte_mode=byte_mode)
+            parallel = nft.CatsTrie.from_sentences_parallel(sentences, processes=1, byte_mode=byte_mode)
+            # The merged shards give exactly the flat columns of the serial build
+            self.assertEqual([list(column) for column in trie.flatten()],
+                             [list(column) for column in (parallel.first_child, parallel.char, parallel.frequency, parallel.max_frequency)])
+            for _ in range(8):
+                prompt = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 3)))
+                self.assertEqual(parallel.autoComplete(prompt), reference_complete(sentences, prompt))
+        self.assertIsNone(nft.CatsTrie.from_sentences_parallel([], processes=1).autoComplete(""))
+
+    def test_from_stream(self):
+        rng = random.Random(28)
+        for _ in range(100):
+            sentences = random_sentences(rng, "abc", 20, 5)
+            # max_distinct=3 spills and merges several runs
+            trie = nft.CatsTrie.from_stream(iter(sentences), max_distinct=3)
+            self.assertEqual(list(trie.items()), list(nft.CatsTrie.from_sentences(sentences).items()))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "sentences")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("abc\r\nab\n\nabc\n\nb\n")
+            # Blank lines in a file are skipped
+            trie = nft.CatsTrie.from_stream(path, max_distinct=1)
+            self.assertEqual(list(trie.items()), list(nft.CatsTrie(["abc", "ab", "abc", "b"]).items()))
+            self.assertEqual(trie.autoComplete("a"), "abc")
+
+    def test_fuzzy(self):
+        rng = random.Random(29)
+        for _ in range(150):
+            byte_mode = rng.random() < 0.3
+            alphabet = "aZé😀" if byte_mode else "abc"
+            sentences = random_sentences(rng, alphabet, 20, 5)
+            trie = nft.CatsTrie(sentences, byte_mode=byte_mode)
+            counts = {}
+            for sentence in sentences:
+                counts[sentence] = counts.get(sentence, 0) + 1
+            for _ in range(4):
+                prompt = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 4)))
+                max_edits = rng.randint(0, 2)
+                matches = []
+                for sentence, count in counts.items():
+                    edits = min(levenshtein(sentence[:i], prompt) for i in range(len(sentence) + 1))
+                    if edits <= max_edits:
+                        matches.append((-count, edits, sentence))
+                self.assertEqual(trie.autoComplete_fuzzy(prompt, max_edits), min(matches)[2] if matches else None)
+        self.assertEqual(nft.CatsTrie(["Héllo wörld"], byte_mode=True).autoComplete_fuzzy("Hallo", 1), "Héllo wörld")
+
+    def test_infix(self):
+        rng = random.Random(30)
+        for _ in range(100):
+            sentences = random_sentences(rng, "abc", 20, 7)
+            trie = nft.CatsTrie.from_sentences(sentences)
+            trie.build_infix_index()
+            for _ in range(8):
+                substring = "".join(rng.choice("abc") for _ in range(rng.randint(0, 4)))
+                matches = [(-sentences.count(sentence), sentence) for sentence in set(sentences) if substring in sentence]
+                self.assertEqual(trie.autoComplete_infix(substring), min(matches)[1] if matches else None)
+        self.assertRaises(ValueError, nft.CatsTrie(["ab"]).autoComplete_infix, "b")
+
+    def test_snapshot(self):
+        rng = random.Random(31)
+        for _ in range(100):
+            sentences = random_sentences(rng, "abc", 15, 4)
+            snapshot = nft.CatsTrie(sentences, top_k=2, snapshot=True)
+            for _ in range(10):
+                sentence = "".join(rng.choice("abc") for _ in range(rng.randint(1, 4)))
+                old_root = snapshot.root
+                before = list(snapshot.items())
+                if rng.random() < 0.5:
+                    delta = rng.randint(1, 3)
+                    snapshot.add_count(sentence, delta)
+                    sentences += [sentence] * delta
+                elif sentence in sentences:
+                    snapshot.remove(sentence)
+                    sentences = [other for other in sentences if other != sentence]
+                else:
+                    continue
+                # The previous version is left untouched
+                view = nft.CatsTrie([])
+                view.root = old_root
+                self.assertEqual(list(view.items()), before)
+                for prompt in ["", "a", "b", "ca"]:
+                    self.assertEqual(snapshot.autoComplete(prompt), reference_complete(sentences, prompt))
+
+if __name__ == '__main__':
+    for case in (TestThroughput, TestThroughputService, TestCatsTrie):
+        suite = unittest.TestLoader().loadTestsFromTestCase(case)
+        unittest.TextTestRunner(verbosity=0).run(suite)